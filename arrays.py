@@ -0,0 +1,277 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for this backend
+    np = None
+
+from engine import WIDTH, HEIGHT, KILL, ENEMY_COOLDOWN, GameState
+from sprites import (SPRITES, RED_SPACE_SHIP, GREEN_SPACE_SHIP, BLUE_SPACE_SHIP,
+                     RED_LASER, GREEN_LASER, BLUE_LASER, YELLOW_LASER)
+
+# color indices shared by the invader and laser arrays
+COLORS = {"red": 0, "green": 1, "blue": 2}
+YELLOW = 3  # player laser
+
+SHIP_IMGS = (RED_SPACE_SHIP, GREEN_SPACE_SHIP, BLUE_SPACE_SHIP)
+LASER_IMGS = (RED_LASER, GREEN_LASER, BLUE_LASER, YELLOW_LASER)
+SHIP_MASKS = [SPRITES.mask(img) for img in SHIP_IMGS]
+LASER_MASKS = [SPRITES.mask(img) for img in LASER_IMGS]
+
+
+class ArrayGameState(GameState):
+    # same rules as GameState, but invaders and lasers are struct-of-arrays
+    # updated with vectorized operations. entity order (spawn order) is kept
+    # so every collision is resolved exactly like the object path
+    def __init__(self, difficulty, seed=None, waves=None):
+        if np is None:
+            raise ImportError("the numpy backend needs numpy installed (python -m pip install numpy)")
+        super().__init__(difficulty, seed, waves)
+        self.setup_sizes()
+
+    # the arrays stand in for GameState's Enemy list, LaserPool and grid
+    def setup_entities(self):
+        # invader positions are where they spawned, self.formation holds how far they've all moved since
+        self.ex = np.zeros(0)
+        self.ey = np.zeros(0)
+        self.elast = np.zeros(0, dtype=np.int64)  # frame of each invader's last shot
+        self.ecolor = np.zeros(0, dtype=np.int8)
+        self.ealive = np.zeros(0, dtype=bool)
+        self.eid = np.zeros(0, dtype=np.int64)  # spawn index, what the fire scheduler queues
+        self.erow = np.zeros(0, dtype=np.int64)  # place in the formation
+        self.ecol = np.zeros(0, dtype=np.int64)
+
+        self.lx = np.zeros(0)
+        self.ly = np.zeros(0)
+        self.lcolor = np.zeros(0, dtype=np.int8)
+        self.lenemy = np.zeros(0, dtype=bool)
+        self.lalive = np.zeros(0, dtype=bool)
+
+    def setup_sizes(self):
+        self.ship_w = np.array([img.get_width() for img in SHIP_IMGS])
+        self.ship_h = np.array([img.get_height() for img in SHIP_IMGS])
+        self.laser_w = np.array([img.get_width() for img in LASER_IMGS])
+        self.laser_h = np.array([img.get_height() for img in LASER_IMGS])
+
+    def save_entities(self):
+        enemies = list(zip(self.erow.tolist(), self.ecol.tolist(), self.ecolor.tolist(), self.elast.tolist()))
+        return enemies, self.laser_rows(), [(when, order) for when, order, i in self.fire.queue]
+
+    # the arrays from a snapshot's rows. positions come back relative to the formation
+    def load_entities(self, snapshot, source=None):
+        self.setup_sizes()
+        formation = self.formation
+        enemies = np.array(snapshot.enemies, dtype=np.int64).reshape(-1, 4)
+        self.erow, self.ecol, self.elast = enemies[:, 0].copy(), enemies[:, 1].copy(), enemies[:, 3].copy()
+        self.ecolor = enemies[:, 2].astype(np.int8)
+        self.ex = np.array(formation.col_x, dtype=float)[self.ecol]
+        self.ey = np.array(formation.row_y, dtype=float)[self.erow]
+        self.eid = self.erow * len(formation.col_x) + self.ecol  # invaders are spawned row by row, see place()
+        self.ealive = np.ones(len(enemies), dtype=bool)
+
+        lasers = np.array(snapshot.lasers, dtype=float).reshape(-1, 4)
+        self.lx, self.ly = lasers[:, 0].copy(), lasers[:, 1].copy()
+        self.lcolor = lasers[:, 2].astype(np.int8)
+        self.lenemy = lasers[:, 3].astype(bool)
+        self.lalive = np.ones(len(lasers), dtype=bool)
+
+        self.fire.queue = [(when, order, order) for when, order in snapshot.fire]
+
+    def place(self, wave):
+        self.formation.reset(*self.formation_layout(wave))
+        rows = len(wave.rows)
+        self.ex = np.tile(wave.x + np.arange(wave.columns) * float(wave.spacing), rows)
+        self.ey = np.repeat(np.array([y for y, color in wave.rows], dtype=float), wave.columns)
+        self.ecolor = np.repeat(np.array([COLORS[color] for y, color in wave.rows], dtype=np.int8), wave.columns)
+        self.elast = np.full(len(self.ex), -ENEMY_COOLDOWN, dtype=np.int64)
+        self.ealive = np.ones(len(self.ex), dtype=bool)
+        self.eid = np.arange(len(self.ex))
+        self.erow = np.repeat(np.arange(rows), wave.columns)
+        self.ecol = np.tile(np.arange(wave.columns), rows)
+
+        self.fire.clear()
+        self.fire.schedule_many(self.frame - 1, range(len(self.ex)))
+
+    def enemy_count(self):
+        return len(self.ex)
+
+    def add_lasers(self, x, y, color, enemy):
+        self.lx = np.concatenate((self.lx, x))
+        self.ly = np.concatenate((self.ly, y))
+        self.lcolor = np.concatenate((self.lcolor, color))
+        self.lenemy = np.concatenate((self.lenemy, np.full(len(x), enemy)))
+        self.lalive = np.concatenate((self.lalive, np.ones(len(x), dtype=bool)))
+
+    def fire_player_laser(self, player):
+        self.add_lasers(np.array([player.x], dtype=float), np.array([player.y], dtype=float),
+                        np.array([YELLOW], dtype=np.int8), False)
+
+    def clear_enemy_lasers(self):
+        self.lalive &= ~self.lenemy
+        self.compact_lasers()
+
+    def compact_enemies(self):
+        keep = self.ealive
+        if not keep.all():
+            for row, col in zip(self.erow[~keep].tolist(), self.ecol[~keep].tolist()):
+                self.formation.remove(row, col)
+            self.ex, self.ey, self.ecolor = self.ex[keep], self.ey[keep], self.ecolor[keep]
+            self.elast, self.ealive, self.eid = self.elast[keep], self.ealive[keep], self.eid[keep]
+            self.erow, self.ecol = self.erow[keep], self.ecol[keep]
+
+    def compact_lasers(self):
+        keep = self.lalive
+        if not keep.all():
+            self.lx, self.ly, self.lcolor, self.lenemy = self.lx[keep], self.ly[keep], self.lcolor[keep], self.lenemy[keep]
+            self.lalive = self.lalive[keep]
+
+    # where the invaders are now
+    def positions(self):
+        return self.ex + self.formation.x, self.ey + self.formation.y
+
+    def sprites(self, alpha=1.0):
+        back = 1.0 - alpha
+        ex, ey = self.positions()
+        ex = ex - back * self.enemy_dx
+        ey = ey - back * self.enemy_dy
+        for x, y, color in zip(ex.tolist(), ey.tolist(), self.ecolor.tolist()):
+            yield SHIP_IMGS[color], x, y
+        yield from self.laser_sprites(alpha)
+
+    def laser_sprites(self, alpha=1.0):
+        back = 1.0 - alpha
+        ly = self.ly + np.where(self.lenemy, -back, back) * self.laser_dy
+        for x, y, color in zip(self.lx.tolist(), ly.tolist(), self.lcolor.tolist()):
+            yield LASER_IMGS[color], x, y
+
+    def invaders(self):
+        ex, ey = self.positions()
+        columns = zip(self.eid.tolist(), self.ecolor.tolist(), ex.tolist(), ey.tolist())
+        return [(key, SHIP_IMGS[color], x, y) for key, color, x, y in columns]
+
+    def formation_anchor(self, alpha=1.0):
+        if not len(self.ex):
+            return None
+        back = 1.0 - alpha
+        x = float(self.ex[0]) + self.formation.x
+        y = float(self.ey[0]) + self.formation.y
+        return int(self.eid[0]), x - back * self.enemy_dx, y - back * self.enemy_dy
+
+    def features(self):
+        return (np.column_stack(self.positions() + (self.ecolor,)),
+                np.column_stack((self.lx, self.ly, self.lcolor)))
+
+    def invader_rows(self):
+        return list(zip(self.erow.tolist(), self.ecol.tolist(), self.ecolor.tolist()))
+
+    def laser_rows(self):
+        return list(zip(self.lx.tolist(), self.ly.tolist(), self.lcolor.tolist(), self.lenemy.tolist()))
+
+    # indices of boxes (x, y, w, h) that may overlap the box at (ox, oy, ow, oh),
+    # using the same truncated offsets that collide() hands to Mask.overlap
+    @staticmethod
+    def rect_candidates(x, y, w, h, ox, oy, ow, oh):
+        dx = np.trunc(ox - x)
+        dy = np.trunc(oy - y)
+        return np.flatnonzero((dx > -ow) & (dx < w) & (dy > -oh) & (dy < h))
+
+    def update_enemies(self, player):
+        n = len(self.ex)
+        if n == 0:
+            return
+        formation = self.formation
+
+        # check if the enemies need to all be shuffled down, only the outermost column can reach the edge
+        move_down = formation.at_edge(self.enemy_velx, self.moving_left, WIDTH)
+        if move_down:
+            self.moving_left = not self.moving_left
+
+        self.enemy_dx = -self.enemy_velx if self.moving_left else self.enemy_velx
+        self.enemy_dy = self.enemy_vely if move_down else 0
+        formation.move(self.enemy_dx, self.enemy_dy)
+
+        # invaders touching the player cost health, invaders past the player end the game
+        ex, ey = self.positions()
+        color = self.ecolor
+        w = self.ship_w[color]
+        h = self.ship_h[color]
+        pw, ph = player.get_width(), player.get_height()
+        hit = np.zeros(n, dtype=bool)
+        for i in self.rect_candidates(ex, ey, w, h, player.x, player.y, pw, ph).tolist():
+            hit[i] = SHIP_MASKS[color[i]].overlap(player.mask, (int(player.x - ex[i]), int(player.y - ey[i]))) is not None
+
+        # until the lowest row gets there no invader can be past the player
+        if formation.bottom_edge() > player.y:
+            bottom = ~hit & (ey + h > player.y)
+        else:
+            bottom = np.zeros(n, dtype=bool)
+
+        if bottom.any():
+            last = int(np.flatnonzero(bottom)[-1])
+            self.lives = 0
+            player.health = -10 * int(hit[last:].sum())
+        else:
+            player.health -= 10 * int(hit.sum())
+
+        self.ealive = ~(hit | bottom)
+        self.compact_enemies()
+
+    # invaders whose turn it is to fire, eid stays sorted so ids map back
+    # to rows with a binary search and destroyed invaders are dropped
+    def fire_enemies(self):
+        due = self.fire.due(self.frame)
+        if due:
+            ids = np.array([order for order, invader in due])
+            rows = np.minimum(np.searchsorted(self.eid, ids), len(self.eid) - 1)
+            found = (self.eid[rows] == ids) if len(self.eid) else np.zeros(len(ids), dtype=bool)
+            last = self.elast
+            shoot = []
+            for i, row, alive in zip(ids.tolist(), rows.tolist(), found.tolist()):
+                if alive:
+                    if self.frame - last[row] >= ENEMY_COOLDOWN:  # same as Enemy.shoot
+                        last[row] = self.frame
+                        shoot.append(row)
+                    self.fire.schedule(self.frame, i, i)
+            if shoot:
+                shoot = np.array(shoot)
+                ex, ey = self.positions()
+                self.add_lasers(ex[shoot] - 10, ey[shoot], self.ecolor[shoot], True)
+
+    # move all lasers and check collisions
+    def update_lasers(self, player, events):
+        if len(self.lx) == 0:
+            return
+        lx, ly, enemy, alive = self.lx, self.ly, self.lenemy, self.lalive
+        laser_vel = self.laser_vel
+
+        ly[enemy] += laser_vel
+        ly[~enemy] -= laser_vel
+        alive &= (ly >= 0) & (ly <= HEIGHT)  # remove lasers once offscreen
+
+        # enemy lasers only touch the player, so they can all be tested at once
+        pw, ph = player.get_width(), player.get_height()
+        color = self.lcolor
+        w = self.laser_w[color]
+        h = self.laser_h[color]
+        for i in self.rect_candidates(lx, ly, w, h, player.x, player.y, pw, ph).tolist():
+            if enemy[i] and alive[i]:
+                if LASER_MASKS[color[i]].overlap(player.mask, (int(player.x - lx[i]), int(player.y - ly[i]))) is not None:
+                    player.health -= 10
+                    alive[i] = False
+
+        # player lasers are resolved in order, each removes the first invader it touches
+        ex, ey = self.positions()
+        ecolor = self.ecolor
+        ew = self.ship_w[ecolor]
+        eh = self.ship_h[ecolor]
+        for i in np.flatnonzero(~enemy & alive).tolist():
+            mask = LASER_MASKS[color[i]]
+            x, y = lx[i], ly[i]
+            for j in self.rect_candidates(x, y, w[i], h[i], ex, ey, ew, eh).tolist():
+                if self.ealive[j] and mask.overlap(SHIP_MASKS[ecolor[j]], (int(ex[j] - x), int(ey[j] - y))) is not None:
+                    self.ealive[j] = False
+                    alive[i] = False
+                    self.score += 10
+                    events.append(KILL)
+                    break
+
+        self.compact_lasers()
+        self.compact_enemies()
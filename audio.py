@@ -0,0 +1,109 @@
+import array
+import time
+
+import pygame
+
+FREQUENCY = 44100
+SAMPLE_SIZE = -16  # signed 16 bit
+CHANNELS = 2  # stereo
+BUFFER = 256  # samples mixed at a time, about 6 ms at 44.1 kHz instead of the default 512
+SFX_CHANNELS = 8  # mixer channels set aside for the sound effect pool
+MAX_VOICES = 3  # copies of one sound that may play at once
+SILENCE = 64  # samples quieter than this at the start of a sound are cut off
+
+
+# set the mixer format before pygame.init() opens the audio device
+def pre_init(buffer=BUFFER, frequency=FREQUENCY):
+    pygame.mixer.pre_init(frequency, SAMPLE_SIZE, CHANNELS, buffer)
+
+
+# plays sound effects on a fixed pool of reserved mixer channels. each sound
+# may only have so many copies playing, the oldest copy is cut off for a new
+# one, and once every channel is busy the oldest voice of any sound is stolen,
+# so rapid fire can neither run the mixer out of channels nor stack up into
+# clipping
+class AudioManager:
+    def __init__(self, channels=SFX_CHANNELS):
+        self.size = channels
+        self.sounds = {}  # name -> [Sound, max voices, path, volume]
+        self.plays = 0
+        self.limited = 0  # plays that cut off an older copy of the same sound
+        self.stolen = 0  # plays that cut off another sound because the pool was full
+        self.setup_channels()
+
+    def setup_channels(self):
+        self.enabled = pygame.mixer.get_init() is not None
+        self.channels = []
+        self.voices = [None] * self.size  # (name, started) last played on each pool channel
+        if not self.enabled:
+            return
+        if pygame.mixer.get_num_channels() < self.size:
+            pygame.mixer.set_num_channels(self.size)
+        pygame.mixer.set_reserved(self.size)  # Sound.play() never picks a pool channel
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.size)]
+
+    def load(self, name, path, max_voices=MAX_VOICES, volume=1.0):
+        sound = self.load_sound(path, volume) if self.enabled else None
+        self.sounds[name] = [sound, max_voices, path, volume]
+        return sound
+
+    # the sound with its silent lead-in removed, so it is heard as soon as it is played
+    def load_sound(self, path, volume):
+        sound = pygame.mixer.Sound(path)
+        frequency, size, channels = pygame.mixer.get_init()
+        if size in (16, -16):
+            samples = array.array("h", sound.get_raw())
+            start = next((i for i, sample in enumerate(samples) if abs(sample) >= SILENCE), 0)
+            start -= start % channels  # keep whole frames
+            if start:
+                sound = pygame.mixer.Sound(buffer=samples[start:].tobytes())
+        sound.set_volume(volume)
+        return sound
+
+    # close and reopen the mixer with a new buffer size, reloading every sound
+    def restart(self, buffer, frequency=FREQUENCY):
+        pygame.mixer.quit()
+        pygame.mixer.init(frequency, SAMPLE_SIZE, CHANNELS, buffer)
+        self.setup_channels()
+        for name, (sound, max_voices, path, volume) in list(self.sounds.items()):
+            self.load(name, path, max_voices, volume)
+
+    def play(self, name):
+        if not self.enabled:
+            return None
+        sound, max_voices = self.sounds[name][:2]
+        voices = self.voices
+        free = None
+        oldest = None
+        same = []  # pool channels playing this sound
+        for i, channel in enumerate(self.channels):
+            voice = voices[i]
+            if voice is None or not channel.get_busy():
+                if free is None:
+                    free = i
+                continue
+            if voice[0] == name:
+                same.append(i)
+            if oldest is None or voice[1] < voices[oldest][1]:
+                oldest = i
+
+        if len(same) >= max_voices:
+            i = min(same, key=lambda i: voices[i][1])
+            self.limited += 1
+        elif free is not None:
+            i = free
+        else:
+            i = oldest
+            self.stolen += 1
+        channel = self.channels[i]
+        channel.play(sound)
+        voices[i] = (name, time.perf_counter())
+        self.plays += 1
+        return channel
+
+    def busy(self):
+        return sum(1 for channel in self.channels if channel.get_busy())
+
+    def stop(self):
+        for channel in self.channels:
+            channel.stop()
@@ -0,0 +1,164 @@
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # keep the banner out of results written to stdout
+
+from engine import (WIDTH, LASER_VELS, ENEMY_VELS, COOLDOWNS, ENEMY_FIRE_PROBS, LEFT, RIGHT, FIRE, FIRED, KILL,
+                    BACKENDS, new_game, random_policy, use_dummy_drivers)
+
+FIELDS = ("difficulty", "laser_vel", "enemy_vel", "cooldown", "enemy_fire_prob", "policy", "seed",
+          "level", "score", "frames", "shots", "kills", "lives")
+
+
+# player that holds fire and sweeps from wall to wall
+def sweep_policy(rng):
+    direction = RIGHT if rng.random() < 0.5 else LEFT
+
+    def policy(state):
+        nonlocal direction
+        player = state.player
+        if player.x <= 10:
+            direction = RIGHT
+        elif player.x + player.get_width() >= WIDTH - 10:
+            direction = LEFT
+        return FIRE | direction
+    return policy
+
+
+# player that never moves and only fires
+def still_policy(rng):
+    def policy(state):
+        return FIRE
+    return policy
+
+
+POLICIES = {"random": random_policy, "sweep": sweep_policy, "still": still_policy}
+
+
+# one game of the sweep. jobs only hold plain values so they pickle cheaply
+def play(job):
+    difficulty, params, policy_name, seed, max_frames, backend = job
+    state = new_game(difficulty, backend, seed)
+    state.tune(**params)
+    policy = POLICIES[policy_name](random.Random(seed))
+    shots = kills = 0
+    while not state.over and (max_frames is None or state.frame < max_frames):
+        for event in state.step(policy(state)):
+            if event == FIRED:
+                shots += 1
+            elif event == KILL:
+                kills += 1
+
+    return dict(difficulty=difficulty, **params, policy=policy_name, seed=seed, level=state.level,
+                score=state.score, frames=state.frame, shots=shots, kills=kills, lives=state.lives)
+
+
+# every combination of the parameter lists, games seeds each. the same seeds
+# are reused for every combination so they are compared on the same games
+def make_jobs(difficulty, grid, policy, games, seed, max_frames, backend):
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        for game in range(games):
+            yield difficulty, params, policy, seed + game, max_frames, backend
+
+
+class CsvSink:
+    def __init__(self, out):
+        self.writer = csv.DictWriter(out, fieldnames=FIELDS)
+        self.writer.writeheader()
+
+    def write(self, result):
+        self.writer.writerow(result)
+
+
+class JsonlSink:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, result):
+        self.out.write(json.dumps(result) + "\n")
+
+
+# argparse type for the game parameters, none of which work at zero or below
+def positive_int(text):
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+
+def init_worker():
+    use_dummy_drivers()
+
+
+# play every job across a pool of processes and write each result as soon as
+# it is in, so a long sweep can be watched or cut short without losing rows
+def run_batch(jobs, sink, workers, total, chunksize=None, progress=None):
+    if chunksize is None:  # big enough to keep pickling overhead down, small enough to balance
+        chunksize = max(1, min(64, total // (workers * 8)))
+    done = 0
+    with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+        for result in pool.imap_unordered(play, jobs, chunksize):
+            sink.write(result)
+            done += 1
+            if progress is not None:
+                progress(done, total)
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play a grid of difficulty settings headless across many processes.")
+    parser.add_argument("--difficulty", type=int, choices=range(len(LASER_VELS)), default=1,
+                        help="difficulty the grid starts from, any parameter not given keeps its value")
+    parser.add_argument("--laser-vel", type=positive_int, nargs="+", help=f"laser speeds to try (tables: {LASER_VELS})")
+    parser.add_argument("--enemy-vel", type=positive_int, nargs="+", help=f"invader speeds to try (tables: {ENEMY_VELS})")
+    parser.add_argument("--cooldown", type=positive_int, nargs="+", help=f"player fire cooldowns to try (tables: {COOLDOWNS})")
+    parser.add_argument("--fire-prob", type=positive_int, nargs="+",
+                        help=f"invader fire chances to try, higher fires less (tables: {ENEMY_FIRE_PROBS})")
+    parser.add_argument("--games", type=positive_int, default=100, help="games per parameter combination")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game in each combination")
+    parser.add_argument("--max-frames", type=positive_int, default=36000,
+                        help="stop a game after this many frames (default 10 minutes of play)")
+    parser.add_argument("--backend", choices=BACKENDS, default="objects")
+    parser.add_argument("--workers", type=positive_int, default=os.cpu_count(), help="processes (default: one per core)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="default: from the output extension, else csv")
+    parser.add_argument("-o", "--output", default="-", help="file to write, - for stdout")
+    args = parser.parse_args()
+
+    d = args.difficulty
+    grid = {"laser_vel": args.laser_vel or [LASER_VELS[d]],
+            "enemy_vel": args.enemy_vel or [ENEMY_VELS[d]],
+            "cooldown": args.cooldown or [COOLDOWNS[d]],
+            "enemy_fire_prob": args.fire_prob or [ENEMY_FIRE_PROBS[d]]}
+    total = args.games
+    for values in grid.values():
+        total *= len(values)
+
+    output_format = args.format or ("jsonl" if args.output.endswith((".jsonl", ".json")) else "csv")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    sink = JsonlSink(out) if output_format == "jsonl" else CsvSink(out)
+
+    def progress(done, total):
+        if done % max(total // 20, 1) == 0 or done == total:
+            elapsed = time.perf_counter() - begin
+            print(f"{done}/{total} games, {elapsed:.1f}s, {done / elapsed:.1f} games/s", file=sys.stderr)
+
+    begin = time.perf_counter()
+    jobs = make_jobs(d, grid, args.policy, args.games, args.seed, args.max_frames, args.backend)
+    try:
+        run_batch(jobs, sink, args.workers, total, progress=progress)
+    finally:
+        if out is not sys.stdout:
+            out.close()
@@ -0,0 +1,653 @@
+import argparse
+import contextlib
+import gc
+import inspect
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from statistics import NormalDist
+
+import pygame
+
+from engine import (WIDTH, HEIGHT, FPS, ENEMY_FIRE_PROBS, FIRE, BACKENDS, GameState, Laser, YELLOW_LASER,
+                    new_game, random_policy, use_dummy_drivers)
+from firing import FireScheduler
+from waves import Wave, WaveSet
+
+BASELINE = "bench-baseline.json"
+COLORS = ("blue", "green", "red")
+
+
+# replace the state's wave with a formation of rows x 10 invaders packed from the top
+def fill_formation(state, rows, spacing=6):
+    state.place(Wave([(70 + spacing * row, COLORS[row % 3]) for row in range(rows)]))
+
+
+# seconds per frame spent testing player lasers against the formation,
+# with the lasers spread under the invaders so none of them hit (the worst case)
+def time_laser_collisions(state, laser_count, use_grid, repeat=20):
+    top = max(enemy.y + enemy.get_height() for enemy in state.enemies) + 10
+    lasers = [Laser((WIDTH - 50) * i / max(laser_count - 1, 1), top + (i * 37) % (HEIGHT - 60 - top), YELLOW_LASER, False)
+              for i in range(laser_count)]
+    grid = state.grid if use_grid else None
+    enemies = state.enemies
+
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        for laser in lasers:
+            laser.move_player_laser(0, enemies, grid)
+    return (time.perf_counter() - begin) / repeat
+
+
+def collision_scaling(laser_counts, rows):
+    state = GameState(1)
+    fill_formation(state, rows)
+    print(f"player laser vs invader collision, {len(state.enemies)} invaders")
+    print(f"{'lasers':>8} {'brute force':>14} {'grid':>14} {'speedup':>8}")
+    for count in laser_counts:
+        brute = time_laser_collisions(state, count, False)
+        grid = time_laser_collisions(state, count, True)
+        print(f"{count:>8} {brute * 1e3:>11.3f} ms {grid * 1e3:>11.3f} ms {brute / grid:>7.1f}x")
+
+
+# attempts fired by invaders rolling randrange every frame, the old way
+def bernoulli_shots(rng, fire_range, invaders, frames):
+    rand = rng.randrange
+    shots = 0
+    for _ in range(frames):
+        for _ in range(invaders):
+            if rand(0, fire_range) == 1:
+                shots += 1
+    return shots
+
+
+# attempts fired by the same invaders through the scheduler
+def scheduled_shots(rng, fire_range, invaders, frames):
+    fire = FireScheduler(rng, fire_range)
+    for i in range(invaders):
+        fire.schedule(-1, i, i)
+    shots = 0
+    for frame in range(frames):
+        for order, invader in fire.due(frame):
+            shots += 1
+            fire.schedule(frame, order, invader)
+    return shots
+
+
+# check that the scheduler fires at the same rate as the per-frame rolls on
+# every difficulty, then time both for a normal and a very large formation.
+# each count is compared against the binomial expectation and the two counts
+# against each other. the z bound is split across all of those comparisons
+# (Bonferroni), so a correct scheduler fails less than false_alarm of the time
+# whatever the seed or number of frames. false if any comparison is past it
+def fire_rate(frames, invaders=50, seed=0, false_alarm=0.001):
+    rng = random.Random(seed)
+    tests = 3 * len(ENEMY_FIRE_PROBS)
+    max_z = NormalDist().inv_cdf(1 - false_alarm / (2 * tests))
+    print(f"fire attempts, {invaders} invaders over {frames} frames")
+    print(f"{'difficulty':>10} {'expected':>10} {'per frame':>10} {'z':>6} {'scheduled':>10} {'z':>6} "
+          f"{'difference z':>13}")
+    worst = 0.0
+    for difficulty, prob in enumerate(ENEMY_FIRE_PROBS):
+        fire_range = prob * FPS
+        chance = 1 / fire_range
+        expected = invaders * frames * chance
+        spread = math.sqrt(expected * (1 - chance))
+        old = bernoulli_shots(rng, fire_range, invaders, frames)
+        new = scheduled_shots(rng, fire_range, invaders, frames)
+        old_z, new_z = (old - expected) / spread, (new - expected) / spread
+        diff_z = (new - old) / (spread * math.sqrt(2))
+        worst = max(worst, abs(old_z), abs(new_z), abs(diff_z))
+        print(f"{difficulty:>10} {expected:>10.0f} {old:>10} {old_z:>6.2f} {new:>10} {new_z:>6.2f} {diff_z:>13.2f}")
+    ok = worst < max_z
+    print(f"rates match, all within |z| < {max_z:.2f}" if ok else f"RATES DIFFER, |z| = {worst:.2f} >= {max_z:.2f}")
+
+    print(f"{'invaders':>10} {'per frame':>14} {'scheduled':>14}")
+    fire_range = ENEMY_FIRE_PROBS[1] * FPS
+    for count in (50, 1000):
+        timing_frames = 600
+        begin = time.perf_counter()
+        bernoulli_shots(rng, fire_range, count, timing_frames)
+        old = (time.perf_counter() - begin) / timing_frames
+        begin = time.perf_counter()
+        scheduled_shots(rng, fire_range, count, timing_frames)
+        new = (time.perf_counter() - begin) / timing_frames
+        print(f"{count:>10} {old * 1e6:>11.1f} us {new * 1e6:>11.1f} us")
+    return ok
+
+
+# a game past the start message with its first wave in, optionally swapped
+# for a bigger formation. it gets endless lives so a run never stops early
+def running_game(backend="objects", rows=None, spacing=6):
+    state = new_game(1, backend, seed=0)
+    state.lives = 10 ** 9
+    while state.start:
+        state.step()
+    state.step()  # first wave
+    if rows is not None:
+        fill_formation(state, rows, spacing)
+    return state
+
+
+# a state scenario: one frame is one step with a seeded random player
+def game_frames(backend="objects", rows=None, spacing=6, lasers=0):
+    def setup():
+        state = running_game(backend, rows, spacing)
+        policy = random_policy(random.Random(0))
+        rng = random.Random(1)
+
+        def frame():
+            # keep the screen saturated with player lasers climbing into the formation
+            if lasers:
+                missing = lasers - sum(1 for laser in state.lasers if not laser.enemy)
+                for _ in range(missing):
+                    state.lasers.spawn(rng.uniform(0, WIDTH - 50), rng.uniform(400, HEIGHT - 200), YELLOW_LASER, False)
+            state.step(policy(state))
+        return frame
+    return setup
+
+
+# a drawn frame of the real game screen: one step plus the HUD and every
+# sprite, either repainting the whole window or only what changed
+def hud_frames(full):
+    def setup():
+        import main
+        game = main.Game(1, running_game())
+        game.enter()
+
+        def frame():
+            game.state.step(FIRE)
+            if full:
+                game.renderer.invalidate()
+            game.redraw_window()
+        return frame
+    return setup
+
+
+SCENARIOS = {
+    "standard": game_frames(),
+    "formation-500": game_frames(rows=50),
+    "formation-2000": game_frames(rows=200, spacing=2),
+    "formation-2000-numpy": game_frames("numpy", rows=200, spacing=2),
+    "lasers-500": game_frames(lasers=500),
+    "hud-full": hud_frames(True),
+    "hud-dirty": hud_frames(False),
+}
+
+
+def percentile(times, fraction):
+    times = sorted(times)
+    return times[min(len(times) - 1, int(len(times) * fraction))]
+
+
+# steps per second as the median of several timed runs, each repeating the
+# scenario from a fresh setup until it has been timed for min_time, so one
+# noisy run can't move it. frame time percentiles come from the median run and
+# are only there to read. peak traced memory (setup included) is taken from
+# one more run, since tracing slows everything down too much to time at the
+# same time
+def measure(setup, frames, runs=5, min_time=0.2):
+    clock = time.perf_counter
+    samples = []
+    for _ in range(runs):
+        times = []
+        while sum(times) < min_time:
+            frame = setup()
+            for _ in range(frames):
+                begin = clock()
+                frame()
+                times.append(clock() - begin)
+        samples.append((len(times) / sum(times), times))
+    samples.sort(key=lambda sample: sample[0])
+    steps_per_s, times = samples[len(samples) // 2]
+
+    gc.collect()
+    tracemalloc.start()
+    frame = setup()
+    for _ in range(frames):
+        frame()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"steps_per_s": steps_per_s, "p50_ms": percentile(times, 0.5) * 1e3,
+            "p99_ms": percentile(times, 0.99) * 1e3, "peak_kb": peak / 1024}
+
+
+def machine():
+    return {"python": platform.python_version(), "pygame": pygame.version.ver, "machine": platform.machine(),
+            "processor": platform.processor(), "system": platform.system()}
+
+
+# metric names the suite fails on, and whether a bigger number is worse.
+# p50/p99 swing too much between runs to gate on and are only reported
+GATED = {"steps_per_s": False, "peak_kb": True}
+
+
+# metrics in result more than tolerance worse than in old, as {metric: change}
+def regressions(result, old, tolerance):
+    worse = {}
+    for metric, higher_is_worse in GATED.items():
+        change = result[metric] / old[metric] - 1 if old[metric] else 0.0
+        if (change > tolerance) if higher_is_worse else (change < -tolerance):
+            worse[metric] = change
+    return worse
+
+
+# run every scenario, compare against a saved baseline and flag anything that
+# got worse by more than tolerance. a scenario that looks slower is measured
+# again and only counts as regressed if the rerun agrees. returns False if
+# something regressed
+def suite(names, frames, baseline_path, save, tolerance):
+    baseline = None
+    if not save and os.path.exists(baseline_path):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["machine"] != machine():
+            print(f"warning: {baseline_path} was saved on {baseline['machine']}, numbers may not compare")
+        if baseline["frames"] != frames:
+            print(f"warning: {baseline_path} was saved with --frames {baseline['frames']}")
+
+    print(f"{'scenario':<22} {'steps/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'peak KB':>10}  vs baseline")
+    results = {}
+    ok = True
+    for name in names:
+        result = results[name] = measure(SCENARIOS[name], frames)
+        notes = []
+        old = baseline["scenarios"].get(name) if baseline else None
+        if old is not None:
+            worse = regressions(result, old, tolerance)
+            if worse:
+                result = results[name] = measure(SCENARIOS[name], frames)
+                worse = regressions(result, old, tolerance)
+            for metric, change in worse.items():
+                notes.append(f"{metric} {change:+.0%} REGRESSED")
+                ok = False
+            if not notes:
+                notes.append(f"ok ({result['steps_per_s'] / old['steps_per_s'] - 1:+.0%} steps/s)")
+        elif baseline:
+            notes.append("no baseline")
+        print(f"{name:<22} {result['steps_per_s']:>10.0f} {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f} "
+              f"{result['peak_kb']:>10.0f}  {', '.join(notes)}")
+
+    if save:
+        with open(baseline_path, "w") as baseline_file:
+            json.dump({"machine": machine(), "frames": frames, "scenarios": results}, baseline_file, indent=2)
+        print(f"baseline saved to {baseline_path}")
+    return ok
+
+
+# allocation rate and garbage collector pauses while both sides fire as fast
+# as they can. Laser objects built are counted by wrapping the constructor,
+# collector pauses are timed through gc.callbacks
+def gc_pressure(frames):
+    state = running_game()
+    state.tune(cooldown=1, enemy_fire_prob=1)
+    state.enemy_vely = 0  # the formation never comes down, so the shooting never stops
+    policy = random_policy(random.Random(0))
+    built = [0]
+    pauses = []
+    started = [0.0]
+
+    def on_gc(phase, info):
+        if phase == "start":
+            started[0] = time.perf_counter()
+        else:
+            pauses.append((info["generation"], time.perf_counter() - started[0]))
+
+    laser_init = Laser.__init__
+
+    def counted_init(self, *args):
+        built[0] += 1
+        laser_init(self, *args)
+
+    gc.collect()
+    gc.callbacks.append(on_gc)
+    Laser.__init__ = counted_init
+    lasers = 0
+    blocks = sys.getallocatedblocks()
+    begin = time.perf_counter()
+    try:
+        for _ in range(frames):
+            state.step(policy(state))
+            lasers += len(state.lasers)
+    finally:
+        elapsed = time.perf_counter() - begin
+        Laser.__init__ = laser_init
+        gc.callbacks.remove(on_gc)
+    blocks = sys.getallocatedblocks() - blocks
+
+    print(f"heavy fire, {frames} frames, {lasers / frames:.0f} lasers on screen on average")
+    print(f"{frames / elapsed:.0f} steps/s, {built[0] / frames:.2f} Laser objects built per frame, "
+          f"{blocks} memory blocks still allocated at the end")
+    for generation in range(3):
+        times = [pause for gen, pause in pauses if gen == generation]
+        if times:
+            print(f"gen {generation}: {len(times)} collections, {sum(times) * 1e3:.2f} ms total, "
+                  f"max {max(times) * 1e3:.3f} ms")
+        else:
+            print(f"gen {generation}: no collections")
+
+
+# large formations from WaveSet.stress: how long the wave takes to spawn, then
+# the time of whole drawn frames (a step plus redrawing the window) against
+# the 60 fps budget while the player fires into the formation
+def stress(sizes, backends, frames):
+    import main
+    budget = 1000 / FPS
+    print(f"{'invaders':>8} {'backend':>8} {'spawn ms':>9} {'step p50':>9} {'step p99':>9} "
+          f"{'frame p50':>10} {'frame p99':>10} {'over budget':>12}")
+    for size in sizes:
+        waves = WaveSet.stress(size)
+        for backend in backends:
+            state = new_game(1, backend, seed=0, waves=waves)
+            state.lives = 10 ** 9
+            while state.start:
+                state.step()
+            begin = time.perf_counter()
+            state.spawn_wave()
+            spawn = time.perf_counter() - begin
+
+            game = main.Game(1, state)
+            game.enter()
+            policy = random_policy(random.Random(0))
+            steps = []
+            drawn = []
+            for _ in range(frames):
+                begin = time.perf_counter()
+                state.step(policy(state))
+                stepped = time.perf_counter()
+                game.redraw_window()
+                steps.append(stepped - begin)
+                drawn.append(time.perf_counter() - begin)
+            game.exit()
+            over = sum(1 for frame in drawn if frame * 1e3 > budget)
+            print(f"{waves.largest():>8} {backend:>8} "
+                  f"{spawn * 1e3:>9.2f} {percentile(steps, 0.5) * 1e3:>9.2f} {percentile(steps, 0.99) * 1e3:>9.2f} "
+                  f"{percentile(drawn, 0.5) * 1e3:>10.2f} {percentile(drawn, 0.99) * 1e3:>10.2f} "
+                  f"{over:>5} of {frames}")
+    print(f"frame budget {budget:.1f} ms")
+
+
+# seconds to load every sprite, and the background, through a fresh registry
+def time_loads(cache_dir, repeat=5):
+    from sprites import SPRITES, SpriteRegistry
+    best = None
+    for _ in range(repeat):
+        registry = SpriteRegistry(cache_dir)
+        begin = time.perf_counter()
+        for name, (filename, size) in SPRITES.sources.items():
+            registry.load(name, filename, size)
+        loaded = time.perf_counter()
+        registry.load("background", "background-black.png", (WIDTH, HEIGHT))
+        times = (loaded - begin, time.perf_counter() - loaded)
+        best = times if best is None else (min(best[0], times[0]), min(best[1], times[1]))
+    return best
+
+
+# seconds per blit of surface onto the window, spread over the screen
+def time_blits(window, surface, count=5000):
+    w, h = window.get_width() - surface.get_width(), window.get_height() - surface.get_height()
+    positions = [((i * 37) % max(w, 1), (i * 91) % max(h, 1)) for i in range(count)]
+    blit = window.blit
+    begin = time.perf_counter()
+    for pos in positions:
+        blit(surface, pos)
+    return (time.perf_counter() - begin) / count
+
+
+# median seconds for a fresh interpreter to import module, which for sprites
+# and everything importing it includes loading every image
+def time_import(module, repeat=5):
+    times = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - begin)
+    return percentile(times, 0.5)
+
+
+# image load time with no cache, an empty cache and a filled one, how long
+# startup takes, then the cost of one blit of each image as loaded and in the
+# display format
+def assets():
+    from sprites import SPRITES
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        uncached = time_loads(None)
+        cold = time_loads(cache_dir, repeat=1)
+        warm = time_loads(cache_dir)
+    finally:
+        shutil.rmtree(cache_dir)
+    print(f"{'loading':<14} {'uncached':>12} {'filling cache':>16} {'from cache':>12}")
+    for i, name in enumerate(("sprites", "background")):
+        print(f"{name:<14} {uncached[i] * 1e3:>9.2f} ms {cold[i] * 1e3:>13.2f} ms {warm[i] * 1e3:>9.2f} ms")
+    print()
+
+    # "sys" is the interpreter starting on its own
+    print(f"{'import':<14} {'fresh process':>16}")
+    for module in ("sys", "pygame", "sprites", "engine", "main"):
+        print(f"{module:<14} {time_import(module) * 1e3:>13.1f} ms")
+    print()
+
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    background = SPRITES.load_scaled(os.path.join("assets", "background-black.png"), (WIDTH, HEIGHT))
+    surfaces = [(name, image, SPRITES.drawable(image)) for name, image in SPRITES.images.items()]
+    surfaces.append(("background", background, background.convert()))
+
+    print(f"{'image':<14} {'as loaded':>12} {'display format':>16} {'speedup':>8}")
+    for name, loaded, converted in surfaces:
+        count = 200 if name == "background" else 5000
+        before = time_blits(window, loaded, count)
+        after = time_blits(window, converted, count)
+        print(f"{name:<14} {before * 1e6:>9.2f} us {after * 1e6:>13.2f} us {before / after:>7.1f}x")
+
+
+# seconds from play() until the sound's first sample reaches the output. SDL's
+# disk audio driver writes what the mixer produces to a file in real time, so
+# the file is watched for the first non-silent sample after each trigger. this
+# covers the mixer's buffering, a sound card adds its own on top
+def trigger_latencies(manager, output, triggers):
+    latencies = []
+    with open(output, "rb") as out:
+        for _ in range(triggers):
+            out.seek(0, os.SEEK_END)
+            begin = time.perf_counter()
+            manager.play("click")
+            heard = None
+            while heard is None and time.perf_counter() - begin < 1.0:
+                data = out.read()
+                if data.strip(b"\0"):
+                    heard = time.perf_counter() - begin
+                elif not data:
+                    time.sleep(0.0002)
+            latencies.append(heard if heard is not None else float("nan"))
+            time.sleep(0.15)  # let the click finish so the next trigger starts from silence
+            manager.stop()
+            time.sleep(0.05)
+    return latencies
+
+
+# share of one core the process uses while sound effects are retriggered at
+# rapid fire rate, compared with the same time spent silent
+def mixer_cpu(manager, seconds=2.0, rate=30):
+    def run(play):
+        wall, cpu = time.perf_counter(), time.process_time()
+        end = wall + seconds
+        while time.perf_counter() < end:
+            if play:
+                manager.play("laser")
+            time.sleep(1 / rate)
+        return (time.process_time() - cpu) / (time.perf_counter() - wall)
+    return run(False), run(True)
+
+
+# voices in use while the player holds fire on every difficulty, under the
+# dummy audio driver (which still mixes in real time)
+def voice_limits(seconds=2.0):
+    import audio
+    from engine import COOLDOWNS
+
+    pygame.mixer.init(audio.FREQUENCY, audio.SAMPLE_SIZE, audio.CHANNELS, audio.BUFFER)
+    manager = audio.AudioManager()
+    manager.load("laser", os.path.join("assets", "laser.wav"))
+    print(f"laser sound {manager.sounds['laser'][0].get_length():.2f} s long, at most {audio.MAX_VOICES} at once")
+    for difficulty, cooldown in enumerate(COOLDOWNS):
+        manager.plays = manager.limited = manager.stolen = 0
+        most = 0
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            manager.play("laser")
+            most = max(most, manager.busy())
+            time.sleep((cooldown + 1) / FPS)  # a shot every time the cooldown runs out
+        manager.stop()
+        print(f"difficulty {difficulty}: {manager.plays} shots, at most {most} voices, "
+              f"{manager.limited} oldest copies cut off, {manager.stolen} stolen")
+    pygame.mixer.quit()
+    print()
+
+
+# trigger to output latency and mixer CPU for a few mixer buffer sizes,
+# played through the disk audio driver instead of a sound card
+def audio_latency(buffers, triggers=20):
+    import audio
+
+    output = os.path.join(tempfile.mkdtemp(), "mixer.raw")
+    os.environ["SDL_AUDIODRIVER"] = "disk"
+    os.environ["SDL_DISKAUDIOFILE"] = output
+    click = bytes(b"\xff\x3f" * 2 * 4410)  # 0.1 s of a constant full-ish level, audible from its first sample
+    try:
+        print(f"{'buffer':>7} {'period':>8} {'p50 latency':>12} {'max':>8} {'idle CPU':>9} {'rapid fire CPU':>15}")
+        for buffer in buffers:
+            pygame.mixer.init(audio.FREQUENCY, audio.SAMPLE_SIZE, audio.CHANNELS, buffer)
+            manager = audio.AudioManager()
+            manager.sounds["click"] = [pygame.mixer.Sound(buffer=click), 1, None, 1.0]
+            manager.load("laser", os.path.join("assets", "laser.wav"))
+            time.sleep(0.2)  # let the device start
+            latencies = sorted(trigger_latencies(manager, output, triggers))
+            idle, busy = mixer_cpu(manager)
+            pygame.mixer.quit()
+            print(f"{buffer:>7} {buffer / audio.FREQUENCY * 1e3:>5.1f} ms {percentile(latencies, 0.5) * 1e3:>9.1f} ms "
+                  f"{latencies[-1] * 1e3:>5.1f} ms {idle:>8.1%} {busy:>14.1%}")
+    finally:
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        shutil.rmtree(os.path.dirname(output))
+
+
+# cycle menu -> game -> game over -> menu through the real scenes, cycles
+# times. false if memory grew more than max_growth KB or the call stack got
+# deeper with the number of games played
+def soak(cycles, max_growth, samples=10):
+    import pygame
+    import main
+    from scenes import SceneManager
+
+    games = 0
+    every = max(cycles // samples, 1)
+    rows = []
+
+    def drive(scene):
+        nonlocal games
+        if isinstance(scene, main.MainMenu):
+            if games >= cycles:
+                pygame.event.post(pygame.event.Event(pygame.QUIT))
+            else:
+                pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=scene.button_1.center))
+        elif isinstance(scene, main.Game):
+            # play until a wave is in and lasers from both sides are in flight,
+            # so every game allocates what a real one does, then jump to the
+            # last frame of the game over message
+            state = scene.state
+            while not state.lost:
+                shooters = {enemy for x, y, kind, enemy in state.laser_rows()}
+                if state.enemy_count() and len(shooters) == 2:
+                    break
+                state.step(FIRE)
+            state.start = False
+            state.lost = True
+            state.lives = 0
+            state.lost_count = FPS * 3 + 1
+            games += 1
+            if games % every == 0:
+                gc.collect()
+                rows.append((games, tracemalloc.get_traced_memory()[0], len(inspect.stack())))
+
+    manager = SceneManager()
+    manager.hooks.append(drive)
+    tracemalloc.start()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        manager.run(main.MainMenu())
+    tracemalloc.stop()
+
+    print(f"{'games':>8} {'traced KB':>10} {'stack depth':>12}")
+    for games_played, size, depth in rows:
+        print(f"{games_played:>8} {size / 1024:>10.1f} {depth:>12}")
+    # the first sample still includes warm-up (font and label caches, imports)
+    first = rows[1] if len(rows) > 1 else rows[0]
+    growth = (max(size for games_played, size, depth in rows[rows.index(first):]) - first[1]) / 1024
+    print(f"{manager.transitions} scene transitions, memory grew up to {growth:.1f} KB "
+          f"between game {first[0]} and game {rows[-1][0]}")
+    ok = True
+    if growth > max_growth:
+        print(f"MEMORY GREW more than {max_growth} KB")
+        ok = False
+    depths = {depth for games_played, size, depth in rows}
+    if len(depths) > 1:
+        print(f"STACK DEPTH CHANGED between samples: {sorted(depths)}")
+        ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the game engine.")
+    parser.add_argument("scenario", nargs="?", choices=("collisions", "soak", "fire-rate", "suite", "gc", "assets",
+                                                          "audio", "stress"),
+                        default="collisions")
+    parser.add_argument("--rows", type=int, default=5, help="invader rows of 10 in the formation")
+    parser.add_argument("--lasers", type=int, nargs="+", default=[1, 10, 50, 100, 250, 500])
+    parser.add_argument("--cycles", type=int, default=2000, help="games to play in the soak test")
+    parser.add_argument("--max-growth", type=float, default=256, help="KB the soak test lets memory grow by")
+    parser.add_argument("--frames", type=int, help="frames per scenario (suite, default 600), to sample "
+                                                "in the fire rate test (default 20000) or to run in the gc test (5000)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500, 1000, 2000, 5000],
+                        help="formation sizes to try in the stress test")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS),
+                        help="backends to try in the stress test")
+    parser.add_argument("--buffers", type=int, nargs="+", default=[128, 256, 512, 1024, 4096],
+                        help="mixer buffer sizes to try in the audio test")
+    parser.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="suite scenarios to run (default all)")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file the suite compares against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this suite run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="change that counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    use_dummy_drivers()
+    if args.scenario == "soak":
+        if not soak(args.cycles, args.max_growth):
+            sys.exit(1)
+    elif args.scenario == "fire-rate":
+        if not fire_rate(args.frames or 20000):
+            sys.exit(1)
+    elif args.scenario == "audio":
+        voice_limits()
+        audio_latency(args.buffers)
+    elif args.scenario == "assets":
+        assets()
+    elif args.scenario == "stress":
+        stress(args.sizes, args.backends, args.frames or 300)
+    elif args.scenario == "gc":
+        gc_pressure(args.frames or 5000)
+    elif args.scenario == "suite":
+        if not suite(args.only or list(SCENARIOS), args.frames or 600, args.baseline, args.save_baseline,
+                     args.tolerance):
+            sys.exit(1)
+    else:
+        collision_scaling(args.lasers, args.rows)
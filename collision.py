@@ -0,0 +1,107 @@
+CELL_SIZE = 64  # about one invader across
+
+
+# uniform grid that buckets objects by the cells their rect covers, so a
+# laser is only mask tested against the invaders next to it. the formation
+# moves rigidly, so the whole grid is translated in O(1) instead of
+# re-bucketing every invader each frame
+class SpatialGrid:
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}  # obj -> (insertion order, cells it was put in)
+        self.count = 0
+        self.dx = 0  # how far everything has moved since it was inserted
+        self.dy = 0
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+        self.count = 0
+        self.dx = 0
+        self.dy = 0
+
+    # cells covered by a rect given in grid space, padded a pixel for int() truncation
+    def cell_keys(self, x, y, w, h):
+        size = self.cell_size
+        x0, y0 = int((x - 1) // size), int((y - 1) // size)
+        x1, y1 = int((x + w + 1) // size), int((y + h + 1) // size)
+        return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+
+    def insert(self, obj):
+        w, h = obj.mask.get_size()
+        keys = self.cell_keys(obj.x - self.dx, obj.y - self.dy, w, h)
+        for key in keys:
+            self.cells.setdefault(key, []).append(obj)
+        self.entries[obj] = (self.count, keys)
+        self.count += 1
+
+    # insert a batch of objects, same as inserting them one at a time
+    def insert_many(self, objs):
+        cells = self.cells
+        entries = self.entries
+        dx, dy = self.dx, self.dy
+        count = self.count
+        for obj in objs:
+            w, h = obj.mask.get_size()
+            keys = self.cell_keys(obj.x - dx, obj.y - dy, w, h)
+            for key in keys:
+                cell = cells.get(key)
+                if cell is None:
+                    cells[key] = [obj]
+                else:
+                    cell.append(obj)
+            entries[obj] = (count, keys)
+            count += 1
+        self.count = count
+
+    # a copy holding mapping[obj] in place of each obj, cheaper than inserting them again
+    def copy(self, mapping):
+        grid = SpatialGrid(self.cell_size)
+        grid.cells = {key: [mapping[obj] for obj in objs] for key, objs in self.cells.items()}
+        grid.entries = {mapping[obj]: entry for obj, entry in self.entries.items()}  # cell key lists are never changed
+        grid.count = self.count
+        grid.dx = self.dx
+        grid.dy = self.dy
+        return grid
+
+    def __contains__(self, obj):
+        return obj in self.entries
+
+    def remove(self, obj):
+        entry = self.entries.pop(obj, None)
+        if entry is not None:
+            for key in entry[1]:
+                self.cells[key].remove(obj)
+
+    # translate every object in the grid, objects must move by the same amount themselves
+    def move(self, dx, dy):
+        self.dx += dx
+        self.dy += dy
+
+    # objects sharing a cell with obj's rect, in no particular order
+    def nearby(self, obj):
+        w, h = obj.mask.get_size()
+        found = set()
+        for key in self.cell_keys(obj.x - self.dx, obj.y - self.dy, w, h):
+            found.update(self.cells.get(key, ()))
+        return found
+
+    # objects whose rect overlaps obj's rect (the same offsets collide() uses),
+    # in insertion order so the first hit matches a scan of the original list
+    def query(self, obj):
+        w, h = obj.mask.get_size()
+        x, y = obj.x, obj.y
+
+        candidates = []
+        for other in self.nearby(obj):
+            ow, oh = other.mask.get_size()
+            offset_x = int(other.x - x)
+            offset_y = int(other.y - y)
+            if -ow < offset_x < w and -oh < offset_y < h:
+                candidates.append(other)
+
+        if len(candidates) > 1:
+            entries = self.entries
+            candidates.sort(key=lambda other: entries[other][0])
+        return candidates
@@ -0,0 +1,694 @@
+import argparse
+import itertools
+import os
+import random
+import time
+
+import pygame
+
+from collision import SpatialGrid
+from firing import FireScheduler
+from formation import Formation
+from snapshot import Snapshot
+from waves import WaveSet, WaveError
+from sprites import (SPRITES, RED_SPACE_SHIP, GREEN_SPACE_SHIP, BLUE_SPACE_SHIP, YELLOW_SPACE_SHIP,
+                     RED_LASER, GREEN_LASER, BLUE_LASER, YELLOW_LASER)
+
+WIDTH, HEIGHT = 1000, 1000  # resolution
+FPS = 60  # frame rate
+
+# difficulty parameters (easy, normal, hard)
+LASER_VELS = [5, 8, 10]
+ENEMY_VELS = [1, 3, 6]
+COOLDOWNS = [30, 15, 10]
+ENEMY_FIRE_PROBS = [25, 15, 10]
+
+PLAYER_VEL = 5
+ENEMY_COOLDOWN = 30  # frames between an invader's shots
+PLAYER_Y = 825
+
+# entity kinds reported by GameState.features(), same numbering as the numpy backend's colors
+KINDS = {RED_SPACE_SHIP: 0, GREEN_SPACE_SHIP: 1, BLUE_SPACE_SHIP: 2,
+         RED_LASER: 0, GREEN_LASER: 1, BLUE_LASER: 2, YELLOW_LASER: 3}
+KIND_COLORS = ("red", "green", "blue")  # invader color of each kind
+KIND_SHIPS = (RED_SPACE_SHIP, GREEN_SPACE_SHIP, BLUE_SPACE_SHIP)  # invader image of each kind
+KIND_LASERS = (RED_LASER, GREEN_LASER, BLUE_LASER, YELLOW_LASER)  # laser image of each kind
+
+# plain values of a GameState and its Player that a Snapshot copies as they are
+GAME_FIELDS = ("difficulty", "seed", "level", "lives", "score", "base_velx", "enemy_velx", "enemy_vely",
+               "enemy_fire_prob", "laser_vel", "cooldown_time", "moving_left", "frame", "start", "start_count",
+               "lost", "lost_count", "over", "enemy_dx", "enemy_dy", "laser_dy", "player_dx")
+PLAYER_FIELDS = ("x", "y", "health", "cooldown_time", "cool_down_counter", "max_health")
+
+# input bits passed to GameState.step
+LEFT = 1
+RIGHT = 2
+FIRE = 4
+
+# events returned by GameState.step
+FIRED = "fired"  # player fired a laser
+KILL = "kill"  # player laser destroyed an invader
+DIED = "died"  # player lost a life
+GAME_OVER = "game_over"  # player ran out of lives
+
+LASER_POOL = 128  # lasers built up front, the pool grows past this if it has to
+
+WAVES = WaveSet.load()  # formation of every level, see waves.json
+
+
+class Laser:
+    __slots__ = ("x", "y", "img", "enemy", "mask")
+
+    def __init__(self, x, y, img, enemy):
+        self.x = x
+        self.y = y
+        self.img = img
+        self.enemy = enemy
+        self.mask = SPRITES.mask(img)
+
+    # turn a spent laser into a new one
+    def reset(self, x, y, img, enemy):
+        self.x = x
+        self.y = y
+        self.enemy = enemy
+        if img is not self.img:
+            self.img = img
+            self.mask = SPRITES.mask(img)
+
+    def draw(self, window):
+        window.blit(self.img, (self.x, self.y))
+
+    def move_laser(self, vel, player=None, enemies=None, grid=None, formation=None):
+        if not self.enemy and enemies is not None:
+            return self.move_player_laser(vel, enemies, grid, formation)
+        elif player is not None:
+            return self.move_enemy_laser(vel, player)
+
+        return -1
+
+    # return 0 if no collision, 1 if offscreen, 2 if enemy collision.
+    # with a SpatialGrid of objs only the nearby ones are mask tested, and the
+    # Formation the objs belong to is told about the one destroyed
+    def move_player_laser(self, vel, objs, grid=None, formation=None):
+        self.y -= vel
+
+        if self.off_screen(HEIGHT):  # remove laser if offscreen
+            return 1
+        else:  # remove laser if collides with enemy and destroy it
+            for obj in (objs if grid is None else grid.query(self)):
+                if self.collision(obj):
+                    objs.remove(obj)
+                    if grid is not None:
+                        grid.remove(obj)
+                    if formation is not None:
+                        formation.remove(obj.row, obj.col)
+                    return 2
+
+        return 0
+
+    # return 0 if no collision, 1 if offscreen, 2 if player collision
+    def move_enemy_laser(self, vel, player_obj):
+        self.y += vel
+
+        if self.off_screen(HEIGHT):  # remove laser if offscreen
+            return 1
+        elif self.collision(player_obj):  # remove laser if collides with player and decrement hp
+            player_obj.health -= 10
+            return 2
+
+        return 0
+
+    def off_screen(self, height):
+        return not height >= self.y >= 0
+
+    def collision(self, obj):
+        return collide(self, obj)
+
+
+# what the player and the invaders share: a sprite, its mask and health.
+# where a ship is and how its shots are timed differ, see Player and Enemy
+class Ship:
+    __slots__ = ("health", "ship_img", "laser_img", "cooldown_time", "mask")
+
+    def __init__(self, health=100, cooldown_time=30):
+        self.health = health
+        self.ship_img = None
+        self.laser_img = None
+        self.cooldown_time = cooldown_time
+
+    def draw(self, window):
+        window.blit(self.ship_img, (self.x, self.y))
+
+    def get_width(self):
+        return self.ship_img.get_width()
+
+    def get_height(self):
+        return self.ship_img.get_height()
+
+
+class Player(Ship):
+    __slots__ = ("x", "y", "cool_down_counter", "max_health")
+
+    def __init__(self, x, y, health=1, cooldown_time=30):
+        super().__init__(health, cooldown_time)
+        self.x = x
+        self.y = y
+        self.cool_down_counter = 0
+        self.ship_img = YELLOW_SPACE_SHIP
+        self.laser_img = YELLOW_LASER
+        self.mask = SPRITES.mask(self.ship_img)
+        self.max_health = health
+
+    def cooldown(self):
+        if self.cool_down_counter >= self.cooldown_time:
+            self.cool_down_counter = 0
+        elif self.cool_down_counter > 0:
+            self.cool_down_counter += 1
+
+    # return 0 if no laser is ready to fire or 1 if it is ready to fire
+    def shoot(self):
+        if self.cool_down_counter == 0:
+            self.cool_down_counter = 1
+            return 1
+        else:
+            return 0
+
+    def healthbar(self, window):
+        pygame.draw.rect(window, (255, 0, 0), (self.x, self.y + self.ship_img.get_height() + 10,
+                                               self.ship_img.get_width(), 10))
+        pygame.draw.rect(window, (0, 255, 0), (self.x, self.y + self.ship_img.get_height() + 10,
+                                               self.ship_img.get_width() * (self.health / self.max_health), 10))
+
+    def draw(self, window):
+        super().draw(window)
+        #self.healthbar(window)
+
+
+# an invader's position is its place in the formation plus the formation's
+# offset, so moving the formation moves every invader at once
+class Enemy(Ship):
+    __slots__ = ("formation", "row", "col", "last_shot")
+
+    COLOR_MAP = {
+        "red": (RED_SPACE_SHIP, RED_LASER),
+        "green": (GREEN_SPACE_SHIP, GREEN_LASER),
+        "blue": (BLUE_SPACE_SHIP, BLUE_LASER)
+    }
+
+    def __init__(self, formation, row, col, color, health=100):
+        super().__init__(health, ENEMY_COOLDOWN)
+        self.formation = formation
+        self.row = row
+        self.col = col
+        self.ship_img, self.laser_img = self.COLOR_MAP[color]
+        self.last_shot = -ENEMY_COOLDOWN  # frame of the last shot
+        self.mask = SPRITES.mask(self.ship_img)
+
+    @property
+    def x(self):
+        return self.formation.col_x[self.col] + self.formation.x
+
+    @property
+    def y(self):
+        return self.formation.row_y[self.row] + self.formation.y
+
+    # invaders only fire every cooldown_time frames. counted from the frame of
+    # the last shot instead of ticking a counter on every invader every frame
+    def shoot(self, frame):
+        if frame - self.last_shot >= self.cooldown_time:
+            self.last_shot = frame
+            return 1
+        else:
+            return 0
+
+
+# every laser ever fired, reused. the ones in flight are packed at the front in
+# the order they were fired and the spent ones behind them are the free list,
+# so firing takes a spare laser instead of building one and removing one is
+# a swap with the first spent slot instead of a list.remove() scan
+class LaserPool:
+    def __init__(self, capacity=LASER_POOL):
+        self.items = [Laser(0, 0, YELLOW_LASER, False) for _ in range(capacity)]
+        self.count = 0  # lasers in flight
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return itertools.islice(self.items, self.count)
+
+    def spawn(self, x, y, img, enemy):
+        items = self.items
+        if self.count < len(items):
+            laser = items[self.count]
+            laser.reset(x, y, img, enemy)
+        else:
+            laser = Laser(x, y, img, enemy)
+            items.append(laser)
+        self.count += 1
+        return laser
+
+    # keep the lasers keep(laser) is true for. one pass, order kept: each kept
+    # laser swaps down into the first free slot
+    def retain(self, keep):
+        items = self.items
+        kept = 0
+        for i in range(self.count):
+            laser = items[i]
+            if keep(laser):
+                if i != kept:
+                    items[i], items[kept] = items[kept], laser
+                kept += 1
+        self.count = kept
+
+    def clear(self):
+        self.count = 0
+
+
+def collide(obj1, obj2):
+    offset_x = obj2.x - obj1.x
+    offset_y = obj2.y - obj1.y
+    return obj1.mask.overlap(obj2.mask, (int(offset_x), int(offset_y))) is not None
+
+
+class GameState:
+    # all of the game rules, without any window, audio or frame cap.
+    # invaders and lasers are kept as Enemy and Laser objects
+    def __init__(self, difficulty, seed=None, waves=None):
+        SPRITES.warm()
+        self.difficulty = difficulty
+        # every game gets its own generator so a (seed, inputs) pair replays exactly
+        self.seed = random.randrange(2 ** 63) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.level = 0
+        self.lives = 3
+        self.score = 0
+        self.waves = WAVES if waves is None else waves
+
+        self.base_velx = ENEMY_VELS[difficulty]  # the wave's speed scales this
+        self.enemy_velx = self.base_velx  # how fast enemies shuffle horizontally
+        self.enemy_vely = self.waves.wave(1).drop  # how far enemies fall down
+        self.enemy_fire_prob = ENEMY_FIRE_PROBS[difficulty]  # probability of enemies firing. higher number means less likely
+        self.laser_vel = LASER_VELS[difficulty]
+        self.cooldown_time = COOLDOWNS[difficulty]
+        self.moving_left = False
+
+        self.player = self.new_player()
+        self.setup_entities()
+        self.formation = Formation()  # where the invaders are and which are left
+        self.fire = FireScheduler(self.rng, self.enemy_fire_prob * FPS)
+
+        self.frame = 0
+        self.start = True
+        self.start_count = 0
+        self.lost = False
+        self.lost_count = 0
+        self.over = False  # set once the game over message has been shown
+
+        # how far things moved in the last step, used to interpolate drawing
+        self.enemy_dx = 0
+        self.enemy_dy = 0
+        self.laser_dy = 0
+        self.player_dx = 0
+
+    # empty containers for the invaders and lasers
+    def setup_entities(self):
+        self.enemies = []
+        self.lasers = LaserPool()
+        self.grid = SpatialGrid()  # broad phase for the invaders
+
+    # override difficulty parameters before the first step, None keeps the
+    # difficulty's value. used to try out new tables without editing them
+    def tune(self, laser_vel=None, enemy_vel=None, cooldown=None, enemy_fire_prob=None):
+        if laser_vel is not None:
+            self.laser_vel = laser_vel
+        if enemy_vel is not None:
+            self.base_velx = enemy_vel
+            self.enemy_velx = enemy_vel
+        if cooldown is not None:
+            self.cooldown_time = cooldown
+            self.player.cooldown_time = cooldown
+        if enemy_fire_prob is not None:
+            self.enemy_fire_prob = enemy_fire_prob
+            self.fire = FireScheduler(self.rng, enemy_fire_prob * FPS)
+
+    # a copy of the whole game made of plain values, see snapshot.py
+    def snapshot(self):
+        player = self.player
+        enemies, lasers, fire = self.save_entities()
+        return Snapshot(tuple([getattr(self, name) for name in GAME_FIELDS]), self.rng.getstate(),
+                        tuple([getattr(player, name) for name in PLAYER_FIELDS]), self.formation.getstate(),
+                        enemies, lasers, fire)
+
+    # a game carrying on from a snapshot, on this class's backend. waves should be the
+    # WaveSet the game was played with, None for waves.json
+    @classmethod
+    def restore(cls, snapshot, waves=None):
+        state = cls.__new__(cls)  # nothing __init__ builds would survive the restore
+        state.load(snapshot, waves)
+        return state
+
+    # an independent copy to play ahead with, the game itself is untouched
+    def fork(self):
+        state = type(self).__new__(type(self))
+        state.load(self.snapshot(), self.waves, self)
+        return state
+
+    # take on a snapshot's game. source is the game it was just taken from, if
+    # there is one, to copy what is quicker to copy than to rebuild
+    def load(self, snapshot, waves, source=None):
+        for name, value in zip(GAME_FIELDS, snapshot.game):
+            setattr(self, name, value)
+        self.waves = WAVES if waves is None else waves
+        self.rng = random.Random(0)
+        self.rng.setstate(snapshot.rng)
+        self.player = player = Player(0, 0)
+        for name, value in zip(PLAYER_FIELDS, snapshot.player):
+            setattr(player, name, value)
+        self.formation = Formation()
+        self.formation.setstate(snapshot.formation)
+        self.fire = FireScheduler(self.rng, self.enemy_fire_prob * FPS)
+        self.load_entities(snapshot, source)
+
+    # (enemies, lasers, fire) for a Snapshot
+    def save_entities(self):
+        enemies = [(enemy.row, enemy.col, KINDS[enemy.ship_img], enemy.last_shot) for enemy in self.enemies]
+        return enemies, self.laser_rows(), [(when, order) for when, order, invader in self.fire.queue]
+
+    def load_entities(self, snapshot, source=None):
+        formation = self.formation
+        columns = len(formation.col_x)
+        self.enemies = []
+        by_order = {}  # invaders are spawned row by row, see place()
+        for row, col, kind, last_shot in snapshot.enemies:
+            enemy = Enemy(formation, row, col, KIND_COLORS[kind])
+            enemy.last_shot = last_shot
+            self.enemies.append(enemy)
+            by_order[row * columns + col] = enemy
+        if source is None:
+            self.grid = SpatialGrid()
+            self.grid.insert_many(self.enemies)
+        else:
+            self.grid = source.grid.copy(dict(zip(source.enemies, self.enemies)))
+
+        self.lasers = LaserPool(len(snapshot.lasers))
+        for x, y, kind, enemy in snapshot.lasers:
+            self.lasers.spawn(x, y, KIND_LASERS[kind], enemy)
+
+        # the heap is copied as it is, attempts of invaders destroyed since queue None, which is never in the grid
+        self.fire.queue = [(when, order, by_order.get(order)) for when, order in snapshot.fire]
+
+    def new_player(self):
+        return Player(WIDTH/2 - YELLOW_SPACE_SHIP.get_width()/2, PLAYER_Y, cooldown_time=self.cooldown_time)
+
+    def spawn_wave(self):
+        self.level += 1
+        wave = self.waves.wave(self.level)
+        self.enemy_velx = self.base_velx * wave.speed
+        self.enemy_vely = wave.drop
+        self.place(wave)
+
+    # replace the invaders with a wave's formation
+    def place(self, wave):
+        self.grid.clear()
+        self.fire.clear()
+        formation = self.formation
+        formation.reset(*self.formation_layout(wave))
+
+        # the whole formation in one go, rows from the top down
+        self.enemies = [Enemy(formation, row, col, color)
+                        for row, (y, color) in enumerate(wave.rows) for col in range(wave.columns)]
+        self.grid.insert_many(self.enemies)
+
+        # first chance to fire is the frame they appear on
+        self.fire.schedule_many(self.frame - 1, self.enemies)
+
+    # Formation.reset arguments for a wave
+    @staticmethod
+    def formation_layout(wave):
+        ships = [Enemy.COLOR_MAP[color][0] for y, color in wave.rows]
+        col_x = [wave.x + wave.spacing * i for i in range(wave.columns)]
+        row_y = [y for y, color in wave.rows]
+        return col_x, row_y, [ship.get_height() for ship in ships], max(ship.get_width() for ship in ships)
+
+    def enemy_count(self):
+        return len(self.enemies)
+
+    def fire_player_laser(self, player):
+        self.lasers.spawn(player.x, player.y, player.laser_img, False)
+
+    def clear_enemy_lasers(self):
+        self.lasers.retain(lambda laser: not laser.enemy)
+
+    # (image, x, y) for every invader and laser, in draw order. with alpha < 1
+    # they are drawn that far between the previous step and the current one
+    def sprites(self, alpha=1.0):
+        back = 1.0 - alpha
+        enemy_dx, enemy_dy = back * self.enemy_dx, back * self.enemy_dy
+        for enemy in self.enemies:
+            yield enemy.ship_img, enemy.x - enemy_dx, enemy.y - enemy_dy
+        yield from self.laser_sprites(alpha)
+
+    def laser_sprites(self, alpha=1.0):
+        laser_dy = (1.0 - alpha) * self.laser_dy
+        for laser in self.lasers:
+            yield laser.img, laser.x, (laser.y - laser_dy if laser.enemy else laser.y + laser_dy)
+
+    # (key, image, x, y) of every invader in spawn order, the key tells invaders apart
+    def invaders(self):
+        return [(enemy, enemy.ship_img, enemy.x, enemy.y) for enemy in self.enemies]
+
+    # (key, x, y) of one invader, where it is drawn at alpha. None with no invaders
+    def formation_anchor(self, alpha=1.0):
+        if not self.enemies:
+            return None
+        enemy = self.enemies[0]
+        back = 1.0 - alpha
+        return enemy, enemy.x - back * self.enemy_dx, enemy.y - back * self.enemy_dy
+
+    # (x, y, kind) rows for every invader and every laser, in spawn order
+    def features(self):
+        enemies = [(enemy.x, enemy.y, KINDS[enemy.ship_img]) for enemy in self.enemies]
+        lasers = [(laser.x, laser.y, KINDS[laser.img]) for laser in self.lasers]
+        return enemies, lasers
+
+    # (row, col, kind) of every invader in spawn order
+    def invader_rows(self):
+        return [(enemy.row, enemy.col, KINDS[enemy.ship_img]) for enemy in self.enemies]
+
+    # (x, y, kind, fired by an invader) of every laser in the order they were fired
+    def laser_rows(self):
+        return [(laser.x, laser.y, KINDS[laser.img], laser.enemy) for laser in self.lasers]
+
+    # where to draw the player, see sprites()
+    def player_pos(self, alpha=1.0):
+        return self.player.x - (1.0 - alpha) * self.player_dx, self.player.y
+
+    # advance the game by one frame. actions is a bitmask of LEFT, RIGHT and FIRE
+    def step(self, actions=0):
+        events = []
+        self.frame += 1
+        self.enemy_dx = self.enemy_dy = self.laser_dy = self.player_dx = 0
+        player = self.player
+
+        if player.health <= 0:
+            if self.lives > 0:
+                self.lives -= 1
+                events.append(DIED)
+
+            if self.lives <= 0:  # game over
+                if not self.lost:
+                    events.append(GAME_OVER)
+                self.lost = True
+                self.lost_count += 1
+            else:  # player loses a life and respawns
+                self.player = player = self.new_player()
+                # remove enemy lasers
+                self.clear_enemy_lasers()
+
+        # hold the start msg for 2 seconds
+        if self.start:
+            if self.start_count > FPS * 2:
+                self.start = False
+            else:
+                self.start_count += 1
+                return events
+
+        # hold the game over msg for 3 seconds
+        if self.lost:
+            if self.lost_count > FPS * 3:
+                self.over = True
+            return events
+
+        # spawn enemies for new round
+        if self.enemy_count() == 0:
+            self.spawn_wave()
+
+        # move left
+        if actions & LEFT and player.x - PLAYER_VEL > 0:
+            player.x -= PLAYER_VEL
+            self.player_dx -= PLAYER_VEL
+
+        # move right
+        if actions & RIGHT and player.x + PLAYER_VEL + player.get_width() < WIDTH:
+            player.x += PLAYER_VEL
+            self.player_dx += PLAYER_VEL
+
+        # shoot laser
+        if actions & FIRE:
+            if player.shoot():
+                self.fire_player_laser(player)
+                events.append(FIRED)
+
+        self.update_enemies(player)
+        self.fire_enemies()
+        player.cooldown()
+        self.laser_dy = self.laser_vel
+        self.update_lasers(player, events)
+
+        return events
+
+    def update_enemies(self, player):
+        enemies = self.enemies
+        formation = self.formation
+
+        # check if the enemies need to all be shuffled down, only the outermost column can reach the edge
+        move_down = formation.at_edge(self.enemy_velx, self.moving_left, WIDTH)
+        if move_down:
+            self.moving_left = not self.moving_left
+
+        velx = -self.enemy_velx if self.moving_left else self.enemy_velx
+        vely = self.enemy_vely if move_down else 0
+        self.enemy_dx, self.enemy_dy = velx, vely
+
+        # the formation moves as one, so moving it, and the grid, moves every
+        # invader. only the invaders near the player need a mask test
+        formation.move(velx, vely)
+        self.grid.move(velx, vely)
+
+        # game over if enemies reach bottom of the screen. until the lowest row
+        # gets there only invaders touching the player can do anything
+        if formation.count and formation.bottom_edge() > player.y:
+            near_player = self.grid.nearby(player)
+            for enemy in enemies[:]:
+                if enemy in near_player and collide(enemy, player):
+                    player.health -= 10
+                    self.remove_enemy(enemy)
+                elif enemy.y + enemy.get_height() > player.y:
+                    self.lives = 0
+                    player.health = 0
+                    self.remove_enemy(enemy)
+        else:
+            for enemy in self.grid.query(player):
+                if collide(enemy, player):
+                    player.health -= 10
+                    self.remove_enemy(enemy)
+
+    def remove_enemy(self, enemy):
+        self.enemies.remove(enemy)
+        self.grid.remove(enemy)
+        self.formation.remove(enemy.row, enemy.col)
+
+    # invaders whose turn it is to fire, the ones destroyed since are dropped
+    def fire_enemies(self):
+        for order, enemy in self.fire.due(self.frame):
+            if enemy in self.grid:
+                if enemy.shoot(self.frame):
+                    self.lasers.spawn(enemy.x - 10, enemy.y, enemy.laser_img, True)
+                self.fire.schedule(self.frame, order, enemy)
+
+    # move all lasers and check collisions. spent lasers go back to the pool in
+    # the same pass, see LaserPool.retain
+    def update_lasers(self, player, events):
+        pool = self.lasers
+        items = pool.items
+        laser_vel = self.laser_vel
+        enemies, grid, formation = self.enemies, self.grid, self.formation
+        kept = 0
+
+        for i in range(pool.count):
+            laser = items[i]
+            if laser.enemy:
+                laser_collide = laser.move_laser(laser_vel, player=player)
+            else:
+                laser_collide = laser.move_laser(laser_vel, enemies=enemies, grid=grid, formation=formation)
+                if laser_collide == 2:
+                    self.score += 10
+                    events.append(KILL)
+            if not laser_collide:
+                if i != kept:
+                    items[i], items[kept] = items[kept], laser
+                kept += 1
+        pool.count = kept
+
+
+BACKENDS = ("objects", "numpy")
+
+
+# create a game using either the Enemy/Laser object path or the NumPy arrays
+def new_game(difficulty, backend="objects", seed=None, waves=None):
+    if backend == "numpy":
+        from arrays import ArrayGameState
+        return ArrayGameState(difficulty, seed, waves)
+    elif backend == "objects":
+        return GameState(difficulty, seed, waves)
+    raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+# a game carrying on from a Snapshot on either backend
+def restore_game(snapshot, backend="objects", waves=None):
+    if backend == "numpy":
+        from arrays import ArrayGameState
+        return ArrayGameState.restore(snapshot, waves)
+    elif backend == "objects":
+        return GameState.restore(snapshot, waves)
+    raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+# point SDL at its dummy video and audio drivers. must run before pygame.init()
+def use_dummy_drivers():
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+
+# player that holds fire and wanders left and right at random
+def random_policy(rng):
+    def policy(state):
+        return FIRE | rng.choice((0, LEFT, RIGHT))
+    return policy
+
+
+# run one game with no window and no frame cap, return the final state
+def run_headless(difficulty, policy, max_frames=None, backend="objects", seed=None, waves=None):
+    state = new_game(difficulty, backend, seed, waves)
+    while not state.over and (max_frames is None or state.frame < max_frames):
+        state.step(policy(state))
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play random games headless with no frame cap.")
+    parser.add_argument("difficulty", nargs="?", type=int, default=0, help="0 = easy, 1 = normal, 2 = hard")
+    parser.add_argument("games", nargs="?", type=int, default=10)
+    parser.add_argument("--backend", choices=BACKENDS, default="objects")
+    parser.add_argument("--waves", metavar="FILE", help="play the formations in this wave file instead of waves.json")
+    parser.add_argument("--stress", type=int, metavar="N", help="play formations of about N invaders")
+    args = parser.parse_args()
+    if args.stress is not None and args.stress < 1:
+        parser.error("--stress needs at least 1 invader")
+    try:
+        waves = WaveSet.load(args.waves) if args.waves else WaveSet.stress(args.stress) if args.stress else None
+    except WaveError as error:
+        print(error)
+        raise SystemExit(1)
+
+    use_dummy_drivers()
+    frames = 0
+    begin = time.perf_counter()
+    for game in range(args.games):
+        state = run_headless(args.difficulty, random_policy(random.Random(game)), backend=args.backend, seed=game,
+                             waves=waves)
+        frames += state.frame
+        print(f"game {game}: level {state.level}, score {state.score}, frames {state.frame}")
+    elapsed = time.perf_counter() - begin
+    print(f"{frames} frames in {elapsed:.2f}s ({frames / elapsed:.0f} frames/s)")
@@ -0,0 +1,169 @@
+import argparse
+import time
+
+try:
+    import numpy as np
+except ImportError:  # only needed for the vectorized environment
+    np = None
+import pygame
+
+from engine import (WIDTH, HEIGHT, WAVES, GAME_OVER, BACKENDS, YELLOW_SPACE_SHIP, new_game,
+                    use_dummy_drivers)
+
+OBSERVATIONS = ("entities", "frames")
+GRAY = (0.299, 0.587, 0.114)  # rgb weights for the grayscale frames
+
+
+# draws a state into a small surface with sprites scaled down once up front,
+# instead of drawing the full 1000x1000 screen and shrinking that every step
+class FrameRenderer:
+    def __init__(self, size):
+        self.size = size
+        self.scale = size / WIDTH, size / HEIGHT
+        self.surface = pygame.Surface((size, size))
+        self.images = {}  # full size Surface -> scaled Surface
+
+    def scaled(self, image):
+        small = self.images.get(image)
+        if small is None:
+            w = max(1, round(image.get_width() * self.scale[0]))
+            h = max(1, round(image.get_height() * self.scale[1]))
+            small = self.images[image] = pygame.transform.smoothscale(image, (w, h))
+        return small
+
+    # grayscale (size, size) uint8 image of the state written into out
+    def render(self, state, out):
+        sx, sy = self.scale
+        surface = self.surface
+        surface.fill((0, 0, 0))
+        blits = [(self.scaled(image), (int(x * sx), int(y * sy))) for image, x, y in state.sprites()]
+        blits.append((self.scaled(YELLOW_SPACE_SHIP), (int(state.player.x * sx), int(state.player.y * sy))))
+        surface.blits(blits, doreturn=False)
+        rgb = pygame.surfarray.pixels3d(surface)
+        out[...] = (rgb @ GRAY).T  # surfarray is indexed [x, y]
+        del rgb  # unlocks the surface
+
+
+# N independent games stepped together, Gym vector env style. actions are an
+# array of LEFT/RIGHT/FIRE bitmasks, one per game, and every result comes back
+# stacked along the first axis. a finished game is reset on the spot, its final
+# score and length are reported in infos on that step
+class VectorEnv:
+    def __init__(self, num_envs, difficulty=1, backend="objects", observation="entities", frame_size=84,
+                 max_enemies=None, max_lasers=64, max_frames=None, waves=None):
+        if np is None:
+            raise ImportError("the vectorized environment needs numpy installed (python -m pip install numpy)")
+        if observation not in OBSERVATIONS:
+            raise ValueError(f"unknown observation {observation!r}, expected one of {OBSERVATIONS}")
+        self.num_envs = num_envs
+        self.difficulty = difficulty
+        self.backend = backend
+        self.observation = observation
+        self.max_frames = max_frames  # games longer than this are truncated
+        self.waves = WAVES if waves is None else waves
+        if max_enemies is None:
+            max_enemies = self.waves.largest()  # room for every invader of the biggest formation
+        self.states = [None] * num_envs
+        self.seeds = np.zeros(num_envs, dtype=np.int64)  # seed the next reset of each game uses
+
+        # observation buffers, filled in place every step
+        if observation == "frames":
+            self.renderer = FrameRenderer(frame_size)
+            self.frames = np.zeros((num_envs, frame_size, frame_size), dtype=np.uint8)
+        else:
+            self.player = np.zeros((num_envs, 5), dtype=np.float32)  # x, y, health, cooldown, lives
+            self.enemies = np.zeros((num_envs, max_enemies, 4), dtype=np.float32)  # x, y, kind, present
+            self.lasers = np.zeros((num_envs, max_lasers, 4), dtype=np.float32)  # x, y, kind (3 = player), present
+
+    def reset(self, seed=0):
+        for i in range(self.num_envs):
+            self.seeds[i] = seed + i
+            self.reset_game(i)
+        for i in range(self.num_envs):
+            self.observe(i)
+        return self.observations(), self.infos()
+
+    # start game i on its next seed, skipping the start message
+    def reset_game(self, i):
+        state = self.states[i] = new_game(self.difficulty, self.backend, int(self.seeds[i]), self.waves)
+        self.seeds[i] += self.num_envs
+        while state.start:
+            state.step()
+
+    def step(self, actions):
+        n = self.num_envs
+        rewards = np.zeros(n, dtype=np.float32)
+        terminated = np.zeros(n, dtype=bool)
+        truncated = np.zeros(n, dtype=bool)
+        final_score = np.zeros(n, dtype=np.int64)
+        final_frames = np.zeros(n, dtype=np.int64)
+
+        for i, actions_i in enumerate(np.asarray(actions).tolist()):
+            state = self.states[i]
+            score = state.score
+            events = state.step(actions_i)
+            rewards[i] = state.score - score
+            terminated[i] = GAME_OVER in events
+            truncated[i] = self.max_frames is not None and state.frame >= self.max_frames
+            if terminated[i] or truncated[i]:
+                final_score[i], final_frames[i] = state.score, state.frame
+                self.reset_game(i)
+            self.observe(i)
+
+        infos = self.infos()
+        infos["final_score"] = final_score
+        infos["final_frames"] = final_frames
+        return self.observations(), rewards, terminated, truncated, infos
+
+    def observe(self, i):
+        state = self.states[i]
+        if self.observation == "frames":
+            self.renderer.render(state, self.frames[i])
+            return
+
+        player = state.player
+        self.player[i] = player.x, player.y, player.health, player.cool_down_counter, state.lives
+        enemies, lasers = state.features()
+        for rows, out in ((enemies, self.enemies[i]), (lasers, self.lasers[i])):
+            count = min(len(rows), len(out))  # anything past the buffer is dropped
+            out[count:] = 0
+            if count:
+                out[:count, :3] = rows[:count]
+                out[:count, 3] = 1
+
+    def observations(self):
+        if self.observation == "frames":
+            return self.frames
+        return {"player": self.player, "enemies": self.enemies, "lasers": self.lasers}
+
+    def infos(self):
+        states = self.states
+        return {"score": np.array([state.score for state in states]),
+                "level": np.array([state.level for state in states]),
+                "lives": np.array([state.lives for state in states]),
+                "frame": np.array([state.frame for state in states])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure aggregate steps per second of the vectorized environment.")
+    parser.add_argument("--envs", type=int, default=16)
+    parser.add_argument("--steps", type=int, default=1000, help="vector steps to run")
+    parser.add_argument("--difficulty", type=int, default=1)
+    parser.add_argument("--backend", choices=BACKENDS, default="objects")
+    parser.add_argument("--observation", choices=OBSERVATIONS, default="entities")
+    parser.add_argument("--frame-size", type=int, default=84)
+    args = parser.parse_args()
+
+    use_dummy_drivers()
+    env = VectorEnv(args.envs, args.difficulty, args.backend, args.observation, args.frame_size)
+    rng = np.random.default_rng(0)
+    env.reset(seed=0)
+    games = 0
+    begin = time.perf_counter()
+    for _ in range(args.steps):
+        obs, rewards, terminated, truncated, infos = env.step(rng.integers(0, 8, args.envs))
+        games += int((terminated | truncated).sum())
+    elapsed = time.perf_counter() - begin
+    total = args.envs * args.steps
+    print(f"{args.envs} envs x {args.steps} steps ({args.observation}, {args.backend}): {total} steps in "
+          f"{elapsed:.2f}s, {total / elapsed:.0f} steps/s, {games} games finished")
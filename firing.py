@@ -0,0 +1,44 @@
+import heapq
+import math
+
+
+# decides which invaders try to fire on which frame. every invader used to
+# roll randrange(0, n) == 1 every frame, which is a Bernoulli(1/n) trial per
+# frame. the wait until the next success is geometric, so it is drawn once per
+# shot instead and kept in a priority queue. a frame then only costs as much
+# as the number of invaders whose turn it is
+class FireScheduler:
+    def __init__(self, rng, fire_range):
+        self.rng = rng
+        self.chance = 1 / fire_range  # randrange(0, fire_range) == 1
+        self.log_miss = math.log(1 - self.chance)
+        self.queue = []  # (frame, order, invader)
+
+    def clear(self):
+        self.queue.clear()
+
+    # frames until the next success, 1 or more
+    def gap(self):
+        return int(math.log(1.0 - self.rng.random()) / self.log_miss) + 1
+
+    # queue an invader's next attempt after frame. order breaks ties so
+    # invaders due on the same frame come out in formation order
+    def schedule(self, frame, order, invader):
+        heapq.heappush(self.queue, (frame + self.gap(), order, invader))
+
+    # schedule a whole formation at once, ordered by position in invaders.
+    # gaps are drawn in the same order as calling schedule() for each one
+    def schedule_many(self, frame, invaders):
+        gap = self.gap
+        queue = self.queue
+        queue.extend([(frame + gap(), order, invader) for order, invader in enumerate(invaders)])
+        heapq.heapify(queue)
+
+    # pop every attempt due on or before frame, as (order, invader)
+    def due(self, frame):
+        queue = self.queue
+        ready = []
+        while queue and queue[0][0] <= frame:
+            when, order, invader = heapq.heappop(queue)
+            ready.append((order, invader))
+        return ready
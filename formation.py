@@ -0,0 +1,81 @@
+# the invaders' grid: how many are left in each row and column, which columns
+# and row are the outermost ones with any left, and how far the whole formation
+# has moved. invaders only ever move together, so an invader's position is its
+# column's x and row's y plus one offset, and the edge and bottom checks only
+# look at the outermost survivors instead of every invader
+class Formation:
+    def __init__(self):
+        self.x = 0  # how far every invader has moved since the wave spawned
+        self.y = 0
+        self.col_x = []  # spawn x of each column
+        self.row_y = []  # spawn y of each row
+        self.row_h = []  # sprite height of each row
+        self.width = 0  # sprite width, the same for every invader
+        self.col_alive = []  # invaders left in each column
+        self.row_alive = []  # and in each row
+        self.cols = []  # column indices left to right
+        self.rows = []  # row indices by bottom edge, top to bottom
+        self.left = 0  # index into cols of the leftmost column with invaders left
+        self.right = -1  # and of the rightmost
+        self.bottom = -1  # index into rows of the lowest row with invaders left
+        self.count = 0
+
+    def reset(self, col_x, row_y, row_h, width):
+        self.x = 0
+        self.y = 0
+        self.col_x = col_x
+        self.row_y = row_y
+        self.row_h = row_h
+        self.width = width
+        self.col_alive = [len(row_y)] * len(col_x)
+        self.row_alive = [len(col_x)] * len(row_y)
+        self.cols = sorted(range(len(col_x)), key=col_x.__getitem__)
+        self.rows = sorted(range(len(row_y)), key=lambda row: row_y[row] + row_h[row])
+        self.left = 0
+        self.right = len(col_x) - 1
+        self.bottom = len(row_y) - 1
+        self.count = len(col_x) * len(row_y)
+
+    # an invader was destroyed. the outermost column and row only move inwards,
+    # so over a whole wave each is stepped past at most once
+    def remove(self, row, col):
+        self.count -= 1
+        self.col_alive[col] -= 1
+        self.row_alive[row] -= 1
+        cols, col_alive = self.cols, self.col_alive
+        while self.left <= self.right and not col_alive[cols[self.left]]:
+            self.left += 1
+        while self.right >= self.left and not col_alive[cols[self.right]]:
+            self.right -= 1
+        while self.bottom >= 0 and not self.row_alive[self.rows[self.bottom]]:
+            self.bottom -= 1
+
+    # everything needed to rebuild the formation, see snapshot.py. the layout
+    # lists never change after reset() so they are shared, not copied
+    def getstate(self):
+        return (self.x, self.y, self.col_x, self.row_y, self.row_h, self.width, list(self.col_alive),
+                list(self.row_alive), self.cols, self.rows, self.left, self.right, self.bottom, self.count)
+
+    def setstate(self, state):
+        (self.x, self.y, self.col_x, self.row_y, self.row_h, self.width, col_alive, row_alive, self.cols, self.rows,
+         self.left, self.right, self.bottom, self.count) = state
+        self.col_alive = list(col_alive)
+        self.row_alive = list(row_alive)
+
+    def move(self, dx, dy):
+        self.x += dx
+        self.y += dy
+
+    # true if moving vel further (left or right) would take an invader to the
+    # edge of a screen width wide, same test as every invader checking itself
+    def at_edge(self, vel, left, width):
+        if self.count == 0:
+            return False
+        if left:
+            return self.col_x[self.cols[self.left]] + self.x - vel <= 0
+        return self.col_x[self.cols[self.right]] + self.x + vel + self.width >= width
+
+    # y of the lowest invader's bottom edge
+    def bottom_edge(self):
+        row = self.rows[self.bottom]
+        return self.row_y[row] + self.y + self.row_h[row]
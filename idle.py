@@ -0,0 +1,36 @@
+import time
+
+import pygame
+
+# window events that mean the screen has to be painted again
+REDRAW_EVENTS = {pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWSHOWN, pygame.WINDOWRESTORED,
+                 pygame.WINDOWSIZECHANGED, pygame.WINDOWFOCUSGAINED}
+
+
+# blocks on input instead of polling at a fixed frame rate, and keeps track
+# of how much of a screen's life was spent asleep
+class IdleTimer:
+    def __init__(self, timeout=1000):
+        self.timeout = timeout  # ms, wake up at least this often even with no input
+        self.started = time.perf_counter()
+        self.idle = 0.0
+        self.wakeups = 0
+        self.redraws = 0
+
+    # sleep until something happens, then return everything that is queued
+    def wait(self):
+        begin = time.perf_counter()
+        event = pygame.event.wait(self.timeout)
+        self.idle += time.perf_counter() - begin
+        self.wakeups += 1
+
+        events = pygame.event.get()
+        if event.type != pygame.NOEVENT:
+            events.insert(0, event)
+        return events
+
+    def report(self, name):
+        total = time.perf_counter() - self.started
+        percent = 100 * self.idle / total if total > 0 else 0
+        print(f"{name}: idle {self.idle:.1f}s of {total:.1f}s ({percent:.0f}%), "
+              f"{self.wakeups} wakeups, {self.redraws} redraws")
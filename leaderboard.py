@@ -0,0 +1,202 @@
+import argparse
+import os
+import queue
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+DB = "leaderboard.db"
+LEGACY = "hi-score.txt"  # the old single hi-score, imported once into difficulty 0
+TOP_N = 10  # scores kept per difficulty
+DIFFICULTIES = ("easy", "normal", "hard")
+
+
+# top scores per difficulty in SQLite. reads come from a copy kept in memory,
+# writes are handed to a background thread so the disk never holds up a
+# frame, and each write is one transaction so a crash leaves either the old
+# or the new table, never a torn file
+class Leaderboard:
+    def __init__(self, path=DB, top_n=TOP_N):
+        self.path = path
+        self.top_n = top_n
+        self.scores = {}  # difficulty -> [(score, when)] best first
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = None
+        self.load()
+
+    def connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA synchronous = FULL")
+        db.execute("CREATE TABLE IF NOT EXISTS scores (difficulty INTEGER, score INTEGER, time REAL)")
+        db.execute("CREATE INDEX IF NOT EXISTS best ON scores (difficulty, score DESC)")
+        return db
+
+    def load(self):
+        try:
+            db = self.connect()
+            try:
+                rows = db.execute("SELECT difficulty, score, time FROM scores ORDER BY score DESC, time").fetchall()
+                if not rows and os.path.exists(LEGACY):
+                    rows = self.import_legacy(db)
+            finally:
+                db.close()
+        except sqlite3.Error:
+            print("Leaderboard could not be read.")
+            return
+        for difficulty, score, when in rows:
+            scores = self.scores.setdefault(difficulty, [])
+            if len(scores) < self.top_n:
+                scores.append((score, when))
+
+    def import_legacy(self, db):
+        try:
+            with open(LEGACY, "r") as hiscore_file:
+                score = int(hiscore_file.readline())
+        except (OSError, ValueError):
+            return []
+        when = os.path.getmtime(LEGACY)
+        with db:
+            db.execute("INSERT INTO scores VALUES (0, ?, ?)", (score, when))
+        return [(0, score, when)]
+
+    # [(score, when)] best first
+    def top(self, difficulty):
+        with self.lock:
+            return list(self.scores.get(difficulty, ()))
+
+    def best(self, difficulty):
+        scores = self.top(difficulty)
+        return scores[0][0] if scores else 0
+
+    # record a finished game. returns its place (1 = best) or None if it didn't make the list
+    def submit(self, difficulty, score):
+        when = time.time()
+        with self.lock:
+            scores = self.scores.setdefault(difficulty, [])
+            place = 0
+            while place < len(scores) and scores[place][0] >= score:
+                place += 1
+            if place >= self.top_n:
+                return None
+            scores.insert(place, (score, when))
+            del scores[self.top_n:]
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.write_loop, name="leaderboard", daemon=True)
+            self.thread.start()
+        self.queue.put((difficulty, score, when))
+        return place + 1
+
+    def write_loop(self):
+        try:
+            db = self.connect()
+        except sqlite3.Error:
+            print("Leaderboard could not be written.")
+            db = None
+        while True:
+            entry = self.queue.get()
+            try:
+                if entry is None:
+                    break
+                if db is not None:
+                    self.write(db, entry)
+            except sqlite3.Error:
+                print("Leaderboard could not be written.")
+            finally:
+                self.queue.task_done()
+        if db is not None:
+            db.close()
+
+    # add a score and drop whatever fell off the list, as one transaction
+    def write(self, db, entry):
+        difficulty = entry[0]
+        with db:
+            db.execute("INSERT INTO scores VALUES (?, ?, ?)", entry)
+            db.execute("DELETE FROM scores WHERE difficulty = ? AND rowid NOT IN "
+                       "(SELECT rowid FROM scores WHERE difficulty = ? ORDER BY score DESC, time LIMIT ?)",
+                       (difficulty, difficulty, self.top_n))
+
+    # wait until every submitted score is on disk
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+def remove_db(path):
+    for leftover in (path, path + "-journal"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+
+# child side of the crash test: submit scores forever, printing each one
+# once it is known to be committed
+def crash_writer(path):
+    board = Leaderboard(path, top_n=5)
+    score = 0
+    while True:
+        score += 1
+        board.submit(score % 3, score)
+        board.flush()
+        print(score, flush=True)
+
+
+# kill a process that is writing scores as fast as it can at random moments,
+# then check the database is intact and holds every score it had committed
+def crash_test(kills, path):
+    rng = random.Random(0)
+    remove_db(path)
+    committed = 0
+    for kill in range(kills):
+        child = subprocess.Popen([sys.executable, __file__, "--crash-writer", path], stdout=subprocess.PIPE,
+                                 text=True)
+        committed = max(committed, int(child.stdout.readline() or 0))  # wait until it is writing
+        time.sleep(rng.uniform(0, 0.2))
+        child.send_signal(signal.SIGKILL)
+        for line in child.stdout.read().split():
+            committed = max(committed, int(line))
+        child.wait()
+
+        db = sqlite3.connect(path)
+        try:
+            check = db.execute("PRAGMA integrity_check").fetchone()[0]
+            counts = db.execute("SELECT difficulty, COUNT(*) FROM scores GROUP BY difficulty").fetchall()
+            top = db.execute("SELECT MAX(score) FROM scores").fetchone()[0] or 0
+        finally:
+            db.close()
+        if check != "ok" or any(count > 5 for difficulty, count in counts) or top < committed:
+            print(f"kill {kill}: CORRUPT (integrity {check}, rows {counts}, best {top}, committed {committed})")
+            return False
+    print(f"{kills} kills mid-write, database intact every time, {committed} scores committed in total")
+    remove_db(path)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the leaderboard.")
+    parser.add_argument("--db", default=DB)
+    parser.add_argument("--crash-test", type=int, metavar="KILLS",
+                        help="kill a writing process this many times and check the database survives")
+    parser.add_argument("--crash-writer", metavar="DB", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.crash_writer:
+        crash_writer(args.crash_writer)
+    elif args.crash_test:
+        if not crash_test(args.crash_test, "leaderboard-crash-test.db"):
+            sys.exit(1)
+    else:
+        board = Leaderboard(args.db)
+        for difficulty, name in enumerate(DIFFICULTIES):
+            print(f"{name}:")
+            for place, (score, when) in enumerate(board.top(difficulty), 1):
+                print(f"  {place:>2}. {score:>8}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(when))}")
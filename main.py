@@ -1,524 +1,313 @@
+import argparse
 import pygame
 import os
-import random
-
+import time
+
+import audio
+from engine import WIDTH, HEIGHT, FPS, LEFT, RIGHT, FIRE, FIRED, GAME_OVER, BACKENDS, new_game
+from idle import IdleTimer, REDRAW_EVENTS
+from leaderboard import Leaderboard
+from profiler import FrameProfiler
+from render import DirtyRenderer, FormationLayer
+from replay import ReplayWriter
+from scenes import Scene, SceneManager
+from spectate import Broadcaster, ADDRESS
+from sprites import SPRITES
+from timestep import FixedTimestep
+from text import label
+from waves import WaveSet, WaveError
+
+audio.pre_init()  # small mixer buffer, has to come before pygame.init()
 pygame.init()
 pygame.font.init()
 
-WIDTH, HEIGHT = 1000, 1000  # resolution
-FPS = 60  # frame rate
 WIN = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Space Invaders")
 
-# Load images
-RED_SPACE_SHIP = pygame.image.load(os.path.join("assets", "red_spaceship.png"))
-GREEN_SPACE_SHIP = pygame.image.load(os.path.join("assets", "green_spaceship.png"))
-BLUE_SPACE_SHIP = pygame.image.load(os.path.join("assets", "blue_spaceship.png"))
-
-# Player ship
-YELLOW_SPACE_SHIP = pygame.transform.scale(pygame.image.load(os.path.join("assets", "yellow_spaceship.png")), (50, 50))
-
-# Lasers
-RED_LASER = pygame.transform.scale(pygame.image.load(os.path.join("assets", "red_laser.png")), (50, 60))
-GREEN_LASER = pygame.transform.scale(pygame.image.load(os.path.join("assets", "green_laser.png")), (50, 60))
-BLUE_LASER = pygame.transform.scale(pygame.image.load(os.path.join("assets", "blue_laser.png")), (50, 60))
-YELLOW_LASER = pygame.transform.scale(pygame.image.load(os.path.join("assets", "yellow_laser.png")), (50, 60))
-
-# Background
-BG = pygame.transform.scale(pygame.image.load(os.path.join("assets", "background-black.png")), (WIDTH, HEIGHT))
+# Background, opaque so plain convert() is enough
+BG = SPRITES.load_scaled(os.path.join("assets", "background-black.png"), (WIDTH, HEIGHT)).convert()
 
 # SFX
-LASER_SFX = pygame.mixer.Sound(os.path.join("assets", "laser.wav"))
-
-
-class Laser:
-    def __init__(self, x, y, img, enemy):
-        self.x = x
-        self.y = y
-        self.img = img
-        self.enemy = enemy
-        self.mask = pygame.mask.from_surface(self.img)
-
-    def draw(self, window):
-        window.blit(self.img, (self.x, self.y))
-
-    def move_laser(self, vel, player=None, enemies=None):
-        if not self.enemy and enemies is not None:
-            return self.move_player_laser(vel, enemies)
-        elif player is not None:
-            return self.move_enemy_laser(vel, player)
-
-        return -1
-
-    # return 0 if no collision, 1 if offscreen, 2 if enemy collision
-    def move_player_laser(self, vel, objs):
-        self.y -= vel
-
-        if self.off_screen(HEIGHT):  # remove laser if offscreen
-            return 1
-        else:  # remove laser if collides with enemy and destroy it
-            for obj in objs:
-                if self.collision(obj):
-                    objs.remove(obj)
-                    return 2
-
-        return 0
-
-    # return 0 if no collision, 1 if offscreen, 2 if player collision
-    def move_enemy_laser(self, vel, player_obj):
-        self.y += vel
-
-        if self.off_screen(HEIGHT):  # remove laser if offscreen
-            return 1
-        elif self.collision(player_obj):  # remove laser if collides with player and decrement hp
-            player_obj.health -= 10
-            return 2
-
-        return 0
-
-    def off_screen(self, height):
-        return not height >= self.y >= 0
-
-    def collision(self, obj):
-        return collide(self, obj)
-
-
-class Ship:
-
-    def __init__(self, x, y, health=100, cooldown_time=30):
-        self.x = x
-        self.y = y
-        self.health = health
-        self.ship_img = None
-        self.laser_img = None
-        self.cooldown_time = cooldown_time
-        self.cool_down_counter = 0
-
-    def draw(self, window):
-        window.blit(self.ship_img, (self.x, self.y))
-
-    def cooldown(self):
-        if self.cool_down_counter >= self.cooldown_time:
-            self.cool_down_counter = 0
-        elif self.cool_down_counter > 0:
-            self.cool_down_counter += 1
-
-    # return 0 if no laser is ready to fire or 1 if it is ready to fire
-    def shoot(self):
-        if self.cool_down_counter == 0:
-            self.cool_down_counter = 1
-            return 1
-        else:
-            return 0
-
-    def get_width(self):
-        return self.ship_img.get_width()
-
-    def get_height(self):
-        return self.ship_img.get_height()
-
-
-class Player(Ship):
-    def __init__(self, x, y, health=1, cooldown_time=30):
-        super().__init__(x, y, health, cooldown_time)
-        self.ship_img = YELLOW_SPACE_SHIP
-        self.laser_img = YELLOW_LASER
-        self.mask = pygame.mask.from_surface(self.ship_img)
-        self.max_health = health
-
-    def healthbar(self, window):
-        pygame.draw.rect(window, (255, 0, 0), (self.x, self.y + self.ship_img.get_height() + 10,
-                                               self.ship_img.get_width(), 10))
-        pygame.draw.rect(window, (0, 255, 0), (self.x, self.y + self.ship_img.get_height() + 10,
-                                               self.ship_img.get_width() * (self.health / self.max_health), 10))
-
-    # return 0 if no laser is ready to fire or 1 if it is ready to fire
-    def shoot(self):
-        if self.cool_down_counter == 0:
-            self.cool_down_counter = 1
-            pygame.mixer.Sound.play(LASER_SFX)
-            return 1
-        else:
-            return 0
-
-    def draw(self, window):
-        super().draw(window)
-        #self.healthbar(window)
-
-
-class Enemy(Ship):
-    COLOR_MAP = {
-        "red": (RED_SPACE_SHIP, RED_LASER),
-        "green": (GREEN_SPACE_SHIP, GREEN_LASER),
-        "blue": (BLUE_SPACE_SHIP, BLUE_LASER)
-    }
-
-    def __init__(self, x, y, color, health=100):
-        super().__init__(x, y, health)
-        self.ship_img, self.laser_img = self.COLOR_MAP[color]
-        self.mask = pygame.mask.from_surface(self.ship_img)
-
-    # return 1 if the enemy will collide with the edge of the screen
-    def move(self, velx, vely):
-        self.x += velx
-        self.y += vely
-
-        if self.x + velx + self.get_width() >= WIDTH:
-            return 1
-        else:
-            return 0
-
-    def edge_collide(self, vel, left):
-        if not left and self.x + vel + self.get_width() >= WIDTH:  # collide with edge while moving right
-            return 1
-        elif left and self.x - vel <= 0:  # collide with edge while moving left
-            return 1
-        else:
-            return 0
-
-
-def collide(obj1, obj2):
-    offset_x = obj2.x - obj1.x
-    offset_y = obj2.y - obj1.y
-    return obj1.mask.overlap(obj2.mask, (int(offset_x), int(offset_y))) is not None
-
-
-def game_main(difficulty):
-    run = True
-    level = 0
-    lives = 3
-
-    score = 0
-    hiscore = 0
-    try:
-        if os.path.exists(os.path.join("hi-score.txt")):
-            hiscore_file = open("hi-score.txt", "r")
-            hiscore = int(hiscore_file.readline())
-    except:
-        print("Hi-Score file could not be read.")
-
-    main_font = pygame.font.SysFont("arial", 50)
-    start_font = pygame.font.SysFont("arial", 60)
-    lost_font = pygame.font.SysFont("arial", 60)
-
-    # difficulty parameters (easy, normal, hard)
-    laser_vels = [5, 8, 10]
-    enemy_vels = [1, 3, 6]
-    cooldowns = [30, 15, 10]
-    enemy_fire_probs = [25, 15, 10]
-
-    enemy_col = 10  # number of invaders per row
-    enemy_velx = enemy_vels[difficulty]  # how fast enemies shuffle horizontally
-    enemy_vely = 50  # how far enemies fall down
-    enemy_fire_prob = enemy_fire_probs[difficulty]  # probability of enemies firing. higher number means less likely
-    moving_left = False
-
-    player_vel = 5
-    laser_vel = laser_vels[difficulty]
-
-    player = Player(WIDTH/2 - YELLOW_SPACE_SHIP.get_width()/2, 825, cooldown_time=cooldowns[difficulty])
-    enemies = []
-    lasers = []
-
-    clock = pygame.time.Clock()
-
-    start = True
-    start_count = 0
-    lost = False
-    lost_count = 0
-
-    def redraw_window():
-        # draw background
-        WIN.blit(BG, (0, 0))
-
-        # text objects
-        lives_label = main_font.render(f"Lives: {lives}", 1, (255, 255, 255))
-        level_label = main_font.render(f"Level: {level}", 1, (255, 255, 255))
-        score_label = main_font.render(f"Score: {score}", 1, (255, 255, 255))
-        hiscore_label = main_font.render(f"Hi-Score: {hiscore}", 1, (255, 255, 255))
-
-        # draw text to screen
-        WIN.blit(lives_label, (10, HEIGHT - 10 - lives_label.get_height()))
-        WIN.blit(level_label, (WIDTH - level_label.get_width() - 10, HEIGHT - 10 - level_label.get_height()))
-        WIN.blit(score_label, (10, 10))
-        WIN.blit(hiscore_label, (WIDTH - hiscore_label.get_width() - 10, 10))
-        pygame.draw.rect(WIN, (255, 255, 255), (0, HEIGHT - 25 - lives_label.get_height(), WIDTH, 3))
-
-        # redraw player, enemy, and laser sprites
-        player.draw(WIN)
-
-        for enemy_sprite in enemies:
-            enemy_sprite.draw(WIN)
-
-        for laser_sprite in lasers:
-            laser_sprite.draw(WIN)
+AUDIO = audio.AudioManager()
+AUDIO.load("laser", os.path.join("assets", "laser.wav"))
+
+# top scores per difficulty, saved in the background
+LEADERBOARD = Leaderboard()
+
+BACKEND = "objects"  # entity store used by the game rules, see engine.new_game
+RENDER_FPS = FPS  # cap on frames drawn per second, 0 for no cap. the game itself always runs at FPS
+RECORD_DIR = None  # folder to save a replay of every game in, see replay.py
+WAVES = None  # formations to play instead of waves.json, see waves.py
+PROFILE = False  # time every phase of every frame and show the numbers on screen
+PROFILE_OUT = None  # CSV file the last game's frame timings are written to
+OVERLAY_EVERY = 30  # frames between refreshes of the profiler overlay
+SPECTATE = None  # Broadcaster every frame is published to for spectators, see spectate.py
+
+
+# map the keyboard onto the engine's input bits
+def read_actions(keys):
+    actions = 0
+    if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+        actions |= LEFT
+    if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+        actions |= RIGHT
+    if keys[pygame.K_SPACE]:
+        actions |= FIRE
+    return actions
+
+
+class Game(Scene):
+    name = "game"
+
+    def __init__(self, difficulty, state=None):
+        self.difficulty = difficulty
+        self.state = state
+        self.renderer = None
+        self.formation = None  # invaders pre-drawn as one surface
+        self.recorder = None
+        self.hiscore = 0
+        self.shown_level = 0
+        self.hud_line = None
+        self.profiler = None
+        self.overlay = []  # profiler summary labels
+
+    def enter(self):
+        self.hiscore = LEADERBOARD.best(self.difficulty)
+
+        self.hud_line = pygame.Surface((WIDTH, 3))
+        self.hud_line.fill((255, 255, 255))
+
+        if self.state is None:
+            self.state = new_game(self.difficulty, BACKEND, waves=WAVES)
+        self.renderer = DirtyRenderer(WIN, BG)
+        self.formation = FormationLayer(SPRITES.drawable)
+        self.shown_level = self.state.level
+
+        if RECORD_DIR is not None:
+            name = f"game-{time.strftime('%Y%m%d-%H%M%S')}-{self.state.seed}.rep"
+            self.recorder = ReplayWriter(os.path.join(RECORD_DIR, name), self.difficulty, self.state.seed)
+
+        if PROFILE:
+            self.profiler = FrameProfiler(1 / (RENDER_FPS or FPS))
+            self.profiler.instrument_state(self.state)
+            self.profiler.instrument(self, "poll_input", "input")
+            self.profiler.instrument(self, "redraw_window", "render")
+
+    def exit(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.profiler is not None:
+            for line in self.profiler.summary():
+                print(line)
+            if PROFILE_OUT is not None:
+                self.profiler.export(PROFILE_OUT)
+            self.profiler = None
+            self.overlay = []
+        self.state = None
+        self.renderer = None
+        self.formation = None
+        self.hud_line = None
+
+    def redraw_window(self, alpha=1.0):
+        state = self.state
+        # repaint everything when a new wave comes in
+        if state.level != self.shown_level:
+            self.shown_level = state.level
+            self.renderer.invalidate()
+
+        # text objects, only rendered again when the numbers change
+        lives_label = label(f"Lives: {state.lives}", "arial", 50)
+        level_label = label(f"Level: {state.level}", "arial", 50)
+        score_label = label(f"Score: {state.score}", "arial", 50)
+        hiscore_label = label(f"Hi-Score: {self.hiscore}", "arial", 50)
+
+        # text and divider line
+        items = [(lives_label, (10, HEIGHT - 10 - lives_label.get_height())),
+                 (level_label, (WIDTH - level_label.get_width() - 10, HEIGHT - 10 - level_label.get_height())),
+                 (score_label, (10, 10)),
+                 (hiscore_label, (WIDTH - hiscore_label.get_width() - 10, 10)),
+                 (self.hud_line, (0, HEIGHT - 25 - lives_label.get_height()))]
+
+        # player, the invaders as one layer, and laser sprites
+        drawable = SPRITES.drawable
+        items.append((drawable(state.player.ship_img), state.player_pos(alpha)))
+        changed = self.formation.update(state)
+        formation = self.formation.item(state, alpha)
+        if formation is not None:
+            if changed:  # the layer is the same surface, so the renderer can't see it change
+                layer, pos = formation
+                self.renderer.mark(layer.get_rect(topleft=pos))
+            items.append(formation)
+        for img, x, y in state.laser_sprites(alpha):
+            items.append((drawable(img), (x, y)))
 
         # display start message at game beginning
-        if start:
-            start_label = start_font.render("Start", 1, (255, 255, 255))
-            WIN.blit(start_label, (WIDTH / 2 - start_label.get_width() / 2, 350))
+        if state.start:
+            start_label = label("Start", "arial", 60)
+            items.append((start_label, (WIDTH / 2 - start_label.get_width() / 2, 350)))
 
         # display game over message if player loses
-        if lost:
-            lost_label = lost_font.render("Game Over", 1, (255, 255, 255))
-            WIN.blit(lost_label, (WIDTH/2 - lost_label.get_width() / 2, 350))
+        if state.lost:
+            lost_label = label("Game Over", "arial", 60)
+            items.append((lost_label, (WIDTH/2 - lost_label.get_width() / 2, 350)))
 
-        pygame.display.update()
+        # profiler numbers, refreshed a couple of times a second so they stay readable
+        if self.profiler is not None:
+            if self.profiler.frames % OVERLAY_EVERY == 0:
+                self.overlay = [label(line, "consolas", 20) for line in self.profiler.summary()]
+            for i, line_label in enumerate(self.overlay):
+                items.append((line_label, (10, 80 + 22 * i)))
 
-    while run:
-        clock.tick(FPS)
-        redraw_window()
-
-        if player.health <= 0:
-            if lives > 0:
-                lives -= 1
-
-            if lives <= 0:  # game over
-                lost = True
-                lost_count += 1
-
-                # save hi-score in text file
-                try:
-                    if score > hiscore:
-                        new_score_file = open("hi-score.txt", 'w')
-                        new_score_file.write(str(score))
-                        new_score_file.write('\n')
-                        new_score_file.close()
-                except:
-                    print("Hi-Score file could not be written.")
-            else:  # player loses a life and respawns
-                player = Player(WIDTH/2 - YELLOW_SPACE_SHIP.get_width()/2, 825, cooldown_time=cooldowns[difficulty])
-                # remove enemy lasers
-                for alaser in lasers[:]:
-                    if alaser.enemy:
-                        if alaser in lasers:
-                            lasers.remove(alaser)
-
-        # display start msg for 2 seconds
-        if start:
-            if start_count > FPS * 2:
-                start = False
-            else:
-                start_count += 1
-                continue
-
-        # display game over msg for 3 seconds
-        if lost:
-            if lost_count > FPS * 3:
-                main_menu()
-            else:
-                continue
-
-        # spawn enemies for new round
-        if len(enemies) == 0:
-            level += 1
-
-            # place top enemies
-            for i in range(enemy_col):
-                # enemy = Enemy(random.randrange(50, WIDTH - 100), random.randrange(-1500, -100),
-                #              random.choice(["red", "blue", "green"]))
-                enemy = Enemy(65 * i, 70, "blue")
-                enemies.append(enemy)
-
-            # place middle enemies
-            for i in range(enemy_col):
-                # enemy = Enemy(random.randrange(50, WIDTH - 100), random.randrange(-1500, -100),
-                #              random.choice(["red", "blue", "green"]))
-                enemy = Enemy(65 * i, 130, "green")
-                enemies.append(enemy)
-
-            # place middle enemies
-            for i in range(enemy_col):
-                # enemy = Enemy(random.randrange(50, WIDTH - 100), random.randrange(-1500, -100),
-                #              random.choice(["red", "blue", "green"]))
-                enemy = Enemy(65 * i, 180, "green")
-                enemies.append(enemy)
-
-            # place bottom enemies
-            for i in range(enemy_col):
-                # enemy = Enemy(random.randrange(50, WIDTH - 100), random.randrange(-1500, -100),
-                #              random.choice(["red", "blue", "green"]))
-                enemy = Enemy(65 * i, 230, "red")
-                enemies.append(enemy)
-
-            # place bottom enemies
-            for i in range(enemy_col):
-                # enemy = Enemy(random.randrange(50, WIDTH - 100), random.randrange(-1500, -100),
-                #              random.choice(["red", "blue", "green"]))
-                enemy = Enemy(65 * i, 280, "red")
-                enemies.append(enemy)
+        self.renderer.draw(items)
 
+    # handle window events and read the keyboard, None once the window is closed
+    def poll_input(self):
         for event in pygame.event.get():
             # quit pygame if needed
             if event.type == pygame.QUIT:
-                quit()
-
-        keys = pygame.key.get_pressed()
-        # move left
-        if keys[pygame.K_a] and player.x - player_vel > 0:
-            player.x -= player_vel
-        elif keys[pygame.K_LEFT] and player.x - player_vel > 0:
-            player.x -= player_vel
-
-        # move right
-        if keys[pygame.K_d] and player.x + player_vel + player.get_width() < WIDTH:
-            player.x += player_vel
-        elif keys[pygame.K_RIGHT] and player.x + player_vel + player.get_width() < WIDTH:
-            player.x += player_vel
-
-        # # move up
-        # if keys[pygame.K_w] and player.y - player_vel > 0:
-        #     player.y -= player_vel
-        # elif keys[pygame.K_UP] and player.y - player_vel > 0:
-        #     player.y -= player_vel
-        #
-        # # move down
-        # if keys[pygame.K_s] and player.y + player_vel + player.get_height() + 15 < HEIGHT:
-        #     player.y += player_vel
-        # elif keys[pygame.K_DOWN] and player.y + player_vel + player.get_height() + 15 < HEIGHT:
-        #     player.y += player_vel
-
-        # shoot laser
-        if keys[pygame.K_SPACE]:
-            if player.shoot():
-                player_laser = Laser(player.x, player.y, player.laser_img, False)
-                lasers.append(player_laser)
-
-        # check if the enemies need to all be shuffled down
-        move_down = False
-        for enemy in enemies[:]:
-            if enemy.edge_collide(enemy_velx, moving_left):
-                move_down = True
-                moving_left = not moving_left
-                break
-
-        for enemy in enemies[:]:
-            if move_down:
-                if not moving_left:
-                    enemy.move(enemy_velx, enemy_vely)
-                else:
-                    enemy.move(-enemy_velx, enemy_vely)
-            else:
-                if not moving_left:
-                    enemy.move(enemy_velx, 0)
-                else:
-                    enemy.move(-enemy_velx, 0)
-            enemy.cooldown()
-
-            if random.randrange(0, enemy_fire_prob * FPS) == 1:
-                if enemy.shoot():
-                    enemy_laser = Laser(enemy.x - 10, enemy.y, enemy.laser_img, True)
-                    lasers.append(enemy_laser)
-
-            if collide(enemy, player):
-                player.health -= 10
-                enemies.remove(enemy)
-            elif enemy.y + enemy.get_height() > player.y:  # game over if enemies reach bottom of the screen
-                lives = 0
-                player.health = 0
-                enemies.remove(enemy)
-
-        player.cooldown()
-
-        # move all lasers and check collisions
-        for laser in lasers[:]:
-            if laser.enemy:
-                laser_collide = laser.move_laser(laser_vel, player=player)
-                if laser_collide:
-                    lasers.remove(laser)
-            else:
-                laser_collide = laser.move_laser(laser_vel, enemies=enemies)
-                if laser_collide:
-                    lasers.remove(laser)
-                    if laser_collide == 2:
-                        score += 10
-
-
-def main_menu():
-    clock = pygame.time.Clock()
-    click = False
+                return None
+        return read_actions(pygame.key.get_pressed())
+
+    def run(self):
+        state = self.state
+        profiler = self.profiler
+        clock = pygame.time.Clock()
+        # the game always steps FPS times a second, however often it is drawn
+        timestep = FixedTimestep(FPS)
+
+        while True:
+            clock.tick(RENDER_FPS)
+            if profiler is not None:
+                profiler.begin_frame()
+
+            actions = self.poll_input()
+            if actions is None:
+                return None
+            for _ in range(timestep.advance()):
+                events = state.step(actions)
+                if self.recorder is not None:
+                    self.recorder.record(actions)
+                if SPECTATE is not None:
+                    SPECTATE.publish(state)
+
+                if FIRED in events:
+                    AUDIO.play("laser")
+
+                # save the score, the leaderboard writes it to disk in the background.
+                # games on other waves aren't comparable, so they don't count
+                if GAME_OVER in events and WAVES is None:
+                    LEADERBOARD.submit(self.difficulty, state.score)
+
+                # return to the menu once the game over msg has been shown
+                if state.over:
+                    return MainMenu()
+
+            self.redraw_window(timestep.alpha())
+            if profiler is not None:
+                profiler.end_frame()
+
+
+class MainMenu(Scene):
+    name = "main menu"
+
     difficulty = ["Difficulty: Easy", "Difficulty: Normal", "Difficulty: Hard"]
-    diff_i = 0
 
-    while True:
-        clock.tick(FPS)
+    button_1 = pygame.Rect(250, 250, 500, 100)
+    button_2 = pygame.Rect(250, 500, 500, 100)
+    button_3 = pygame.Rect(250, 750, 500, 100)
+    button_4 = pygame.Rect(0, 950, 200, 75)
+    buttons = [button_1, button_2, button_3, button_4]
+
+    def __init__(self, diff_i=0):
+        self.diff_i = diff_i
+
+    def redraw_menu(self, hover):
         WIN.blit(BG, (0, 0))
 
-        mx, my = pygame.mouse.get_pos()
-
-        text_color1 = (255, 255, 255)
-        text_color2 = (255, 255, 255)
-        text_color3 = (255, 255, 255)
-        text_color4 = (255, 255, 255)
-
-        button_1 = pygame.Rect(250, 250, 500, 100)
-        button_2 = pygame.Rect(250, 500, 500, 100)
-        button_3 = pygame.Rect(250, 750, 500, 100)
-        button_4 = pygame.Rect(0, 950, 200, 75)
-
-        # check if menu items were pressed
-        if button_1.collidepoint((mx, my)):
-            text_color1 = (255, 232, 31)
-            if click:
-                game_main(diff_i)
-        if button_2.collidepoint((mx, my)):
-            text_color2 = (255, 232, 31)
-            # change difficulty between easy, medium, hard
-            if click:
-                if diff_i == 2:
-                    diff_i = 0
-                else:
-                    diff_i += 1
-        if button_3.collidepoint((mx, my)):
-            text_color3 = (255, 232, 31)
-            if click:
-                pygame.quit()
-        if button_4.collidepoint((mx, my)):
-            text_color4 = (255, 232, 31)
-            if click:
-                how_to_play()
-
-        pygame.draw.rect(WIN, (19, 17, 17), button_1)
-        pygame.draw.rect(WIN, (19, 17, 17), button_2)
-        pygame.draw.rect(WIN, (19, 17, 17), button_3)
-        pygame.draw.rect(WIN, (19, 17, 17), button_4)
+        text_color1 = (255, 232, 31) if hover == 0 else (255, 255, 255)
+        text_color2 = (255, 232, 31) if hover == 1 else (255, 255, 255)
+        text_color3 = (255, 232, 31) if hover == 2 else (255, 255, 255)
+        text_color4 = (255, 232, 31) if hover == 3 else (255, 255, 255)
+
+        pygame.draw.rect(WIN, (19, 17, 17), self.button_1)
+        pygame.draw.rect(WIN, (19, 17, 17), self.button_2)
+        pygame.draw.rect(WIN, (19, 17, 17), self.button_3)
+        pygame.draw.rect(WIN, (19, 17, 17), self.button_4)
 
         # display title
-        title_font = pygame.font.SysFont("bauhaus 93", 85)
-        title_label = title_font.render("Space Invaders", 1, (255, 255, 255))
+        title_label = label("Space Invaders", "bauhaus 93", 85)
         WIN.blit(title_label, ((WIDTH / 2 - title_label.get_width() / 2), 60))
 
         # display menu text labels
-        menu_font = pygame.font.SysFont("arial", 70)
-        play_label = menu_font.render("Start", 1, text_color1)
+        play_label = label("Start", "arial", 70, text_color1)
         WIN.blit(play_label, ((WIDTH / 2 - play_label.get_width() / 2), 250 + play_label.get_height()/2))
 
-        diff_label = menu_font.render(difficulty[diff_i], 1, text_color2)
+        diff_label = label(self.difficulty[self.diff_i], "arial", 70, text_color2)
         WIN.blit(diff_label, ((WIDTH / 2 - diff_label.get_width() / 2), 500 + diff_label.get_height() / 2))
 
-        exit_label = menu_font.render("Exit", 1, text_color3)
+        exit_label = label("Exit", "arial", 70, text_color3)
         WIN.blit(exit_label, ((WIDTH / 2 - exit_label.get_width() / 2), 750 + exit_label.get_height() / 2))
 
-        help_font = pygame.font.SysFont("arial", 40)
-        help_label = help_font.render("How to Play", 1, text_color4)
+        help_label = label("How to Play", "arial", 40, text_color4)
         WIN.blit(help_label, (10, 950))
 
-        click = False
-        # check for mouse clicks or exiting the game
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    click = True
-
         pygame.display.update()
 
+    def run(self):
+        idle = IdleTimer()
+        shown = None  # (hover, diff_i) currently on screen
+        events = []
+
+        while True:
+            click = None
+            redraw = shown is None
+            # check for mouse clicks, exiting the game or the window needing a repaint
+            for event in events:
+                if event.type == pygame.QUIT:
+                    idle.report(self.name)
+                    return None
+
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.button == 1:
+                        click = event.pos
+
+                if event.type in REDRAW_EVENTS:
+                    redraw = True
+
+            hover = pygame.Rect(pygame.mouse.get_pos(), (1, 1)).collidelist(self.buttons)
+
+            # check if menu items were pressed
+            if click is not None:
+                pressed = pygame.Rect(click, (1, 1)).collidelist(self.buttons)
+                if pressed == 0:
+                    idle.report(self.name)
+                    return Game(self.diff_i)
+                elif pressed == 1:
+                    # change difficulty between easy, medium, hard
+                    if self.diff_i == 2:
+                        self.diff_i = 0
+                    else:
+                        self.diff_i += 1
+                elif pressed == 2:
+                    idle.report(self.name)
+                    return None
+                elif pressed == 3:
+                    idle.report(self.name)
+                    return HowToPlay()
+
+            # only paint when something on screen would look different
+            if redraw or shown != (hover, self.diff_i):
+                shown = (hover, self.diff_i)
+                idle.redraws += 1
+                self.redraw_menu(hover)
+
+            events = idle.wait()
+
+
+class HowToPlay(Scene):
+    name = "how to play"
 
-def how_to_play():
-    clock = pygame.time.Clock()
-    click = False
     help_text1 = "Move left = Left  arrow key "
     help_text2 = "Move right = Right  arrow key"
     help_text3 = "Shoot = Space bar"
@@ -526,61 +315,117 @@ def how_to_play():
     help_text5 = "Shoot every invader before they reach the bottom of the screen."
     help_text6 = "If any invaders reach the bottom of the screen it is game over."
 
-    while True:
-        clock.tick(FPS)
-        WIN.blit(BG, (0, 0))
-
-        mx, my = pygame.mouse.get_pos()
+    return_button = pygame.Rect(250, 850, 500, 100)
 
-        text_color1 = (255, 255, 255)
-
-        return_button = pygame.Rect(250, 850, 500, 100)
+    def redraw_help(self, hover):
+        WIN.blit(BG, (0, 0))
 
-        # check if menu items were pressed
-        if return_button.collidepoint((mx, my)):
-            text_color1 = (255, 232, 31)
-            if click:
-                main_menu()
+        text_color1 = (255, 232, 31) if hover else (255, 255, 255)
 
-        pygame.draw.rect(WIN, (19, 17, 17), return_button)
+        pygame.draw.rect(WIN, (19, 17, 17), self.return_button)
 
         # display title
-        title_font = pygame.font.SysFont("bauhaus 93", 85)
-        title_label = title_font.render("How to Play", 1, (255, 255, 255))
+        title_label = label("How to Play", "bauhaus 93", 85)
         WIN.blit(title_label, ((WIDTH / 2 - title_label.get_width() / 2), 60))
 
         # display control labels
-        help_font = pygame.font.SysFont("arial", 40)
-        help_label1 = help_font.render(help_text1, 1, (255, 255, 255))
+        help_label1 = label(self.help_text1, "arial", 40)
         WIN.blit(help_label1, ((WIDTH / 2 - help_label1.get_width() / 2), 200))
-        help_label2 = help_font.render(help_text2, 1, (255, 255, 255))
+        help_label2 = label(self.help_text2, "arial", 40)
         WIN.blit(help_label2, ((WIDTH / 2 - help_label2.get_width() / 2), 275))
-        help_label3 = help_font.render(help_text3, 1, (255, 255, 255))
+        help_label3 = label(self.help_text3, "arial", 40)
         WIN.blit(help_label3, ((WIDTH / 2 - help_label3.get_width() / 2), 350))
 
         # display game rule labels
-        help_label4 = help_font.render(help_text4, 1, (255, 255, 255))
+        help_label4 = label(self.help_text4, "arial", 40)
         WIN.blit(help_label4, ((WIDTH / 2 - help_label4.get_width() / 2), 500))
-        help_label5 = help_font.render(help_text5, 1, (255, 255, 255))
+        help_label5 = label(self.help_text5, "arial", 40)
         WIN.blit(help_label5, ((WIDTH / 2 - help_label5.get_width() / 2), 575))
-        help_label6 = help_font.render(help_text6, 1, (255, 255, 255))
+        help_label6 = label(self.help_text6, "arial", 40)
         WIN.blit(help_label6, ((WIDTH / 2 - help_label6.get_width() / 2), 650))
 
-        exit_font = pygame.font.SysFont("arial", 60)
-        exit_label = exit_font.render("Main Menu", 1, text_color1)
+        exit_label = label("Main Menu", "arial", 60, text_color1)
         WIN.blit(exit_label, ((WIDTH / 2 - exit_label.get_width() / 2), 850 + exit_label.get_height() / 2))
 
-        click = False
-        # check for mouse clicks or exiting the game
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    click = True
-
         pygame.display.update()
 
-
-main_menu()
+    def run(self):
+        idle = IdleTimer()
+        shown = None  # hover state currently on screen
+        events = []
+
+        while True:
+            click = None
+            redraw = shown is None
+            # check for mouse clicks, exiting the game or the window needing a repaint
+            for event in events:
+                if event.type == pygame.QUIT:
+                    idle.report(self.name)
+                    return None
+
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.button == 1:
+                        click = event.pos
+
+                if event.type in REDRAW_EVENTS:
+                    redraw = True
+
+            hover = self.return_button.collidepoint(pygame.mouse.get_pos())
+
+            # check if menu items were pressed
+            if click is not None and self.return_button.collidepoint(click):
+                idle.report(self.name)
+                return MainMenu()
+
+            if redraw or shown != hover:
+                shown = hover
+                idle.redraws += 1
+                self.redraw_help(hover)
+
+            events = idle.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Space Invaders")
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND, help="entity store used by the game rules")
+    parser.add_argument("--fps", type=int, default=RENDER_FPS, help="frames drawn per second, 0 for no cap")
+    parser.add_argument("--record", metavar="DIR", help="save a replay of every game in this folder")
+    parser.add_argument("--audio-buffer", type=int, default=audio.BUFFER,
+                        help="samples the mixer mixes at a time, smaller means less latency but more CPU")
+    parser.add_argument("--profile", action="store_true", help="time each phase of every frame and show it on screen")
+    parser.add_argument("--profile-out", metavar="FILE", help="profile and save each game's frame timings as CSV")
+    parser.add_argument("--waves", metavar="FILE", help="play the formations in this wave file instead of waves.json")
+    parser.add_argument("--stress", type=int, metavar="N", help="play formations of about N invaders")
+    parser.add_argument("--spectate", nargs="?", const=ADDRESS, metavar="ADDRESS",
+                        help=f"broadcast games to spectators on [host:]port or unix:PATH (default {ADDRESS})")
+    args = parser.parse_args()
+    if args.stress is not None and args.stress < 1:
+        parser.error("--stress needs at least 1 invader")
+    if (args.waves or args.stress) and args.record:
+        parser.error("replays assume the default waves, --record can't be used with --waves or --stress")
+    if args.waves:
+        try:
+            WAVES = WaveSet.load(args.waves)
+        except WaveError as error:
+            print(error)
+            raise SystemExit(1)
+    elif args.stress:
+        WAVES = WaveSet.stress(args.stress)
+    BACKEND = args.backend
+    RENDER_FPS = args.fps
+    RECORD_DIR = args.record
+    if args.audio_buffer != audio.BUFFER:
+        AUDIO.restart(args.audio_buffer)
+    PROFILE = args.profile or args.profile_out is not None
+    PROFILE_OUT = args.profile_out
+    if RECORD_DIR is not None:
+        os.makedirs(RECORD_DIR, exist_ok=True)
+    if args.spectate:
+        SPECTATE = Broadcaster(args.spectate)
+        if not SPECTATE.start():
+            raise SystemExit(1)
+    SceneManager().run(MainMenu())
+    if SPECTATE is not None:
+        SPECTATE.close()
+    LEADERBOARD.close()
+    pygame.quit()
@@ -0,0 +1,98 @@
+import csv
+import time
+from array import array
+
+# phases of a drawn frame. the simulation phases add up over however many
+# steps ran that frame, "frame" is the whole frame from start to finish
+PHASES = ("input", "enemies", "fire", "lasers", "render", "frame")
+CAPACITY = 600  # frames kept, 10 seconds at 60 fps
+
+
+# times each phase of every frame into a fixed-size ring buffer. nothing in the
+# game checks whether profiling is on: instrument() swaps the phase methods of
+# an object for timed wrappers, so with no profiler the game runs untouched
+class FrameProfiler:
+    def __init__(self, budget, capacity=CAPACITY, phases=PHASES):
+        self.budget = budget  # seconds a frame may take before it counts as missed
+        self.capacity = capacity
+        self.phases = phases
+        self.index = {phase: i for i, phase in enumerate(phases)}
+        self.width = len(phases)
+        self.samples = array("d", bytes(8 * capacity * self.width))  # capacity rows of one time per phase
+        self.current = [0.0] * self.width  # times of the frame in progress
+        self.next = 0  # row the next frame is written to
+        self.frames = 0
+        self.missed = 0
+        self.frame_start = 0.0
+
+    # replace obj.<method> with a version that adds its run time to phase
+    def instrument(self, obj, method, phase):
+        func = getattr(obj, method)
+        current = self.current
+        i = self.index[phase]
+        clock = time.perf_counter
+
+        def timed(*args):
+            begin = clock()
+            result = func(*args)
+            current[i] += clock() - begin
+            return result
+        setattr(obj, method, timed)
+
+    # time the simulation phases of a GameState
+    def instrument_state(self, state):
+        self.instrument(state, "update_enemies", "enemies")
+        self.instrument(state, "fire_enemies", "fire")
+        self.instrument(state, "update_lasers", "lasers")
+
+    def begin_frame(self):
+        current = self.current
+        for i in range(self.width):
+            current[i] = 0.0
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        elapsed = time.perf_counter() - self.frame_start
+        self.current[self.index["frame"]] = elapsed
+        if elapsed > self.budget:
+            self.missed += 1
+        start = self.next * self.width
+        self.samples[start:start + self.width] = array("d", self.current)
+        self.next = (self.next + 1) % self.capacity
+        self.frames += 1
+
+    # buffered frames oldest first, as lists of phase times
+    def rows(self):
+        count = min(self.frames, self.capacity)
+        first = (self.next - count) % self.capacity
+        width = self.width
+        for row in range(first, first + count):
+            start = row % self.capacity * width
+            yield self.samples[start:start + width].tolist()
+
+    # {phase: (p50, p99)} in seconds over the buffered frames
+    def percentiles(self):
+        rows = list(self.rows())
+        stats = {}
+        for i, phase in enumerate(self.phases):
+            times = sorted(row[i] for row in rows)
+            if times:
+                stats[phase] = (times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.99))])
+            else:
+                stats[phase] = (0.0, 0.0)
+        return stats
+
+    # lines of text for the overlay
+    def summary(self):
+        lines = [f"{phase:<8} p50 {p50 * 1e3:6.2f} ms  p99 {p99 * 1e3:6.2f} ms"
+                 for phase, (p50, p99) in self.percentiles().items()]
+        lines.append(f"missed {self.missed} of {self.frames} frames (budget {self.budget * 1e3:.1f} ms)")
+        return lines
+
+    # buffered frames as CSV, one row per frame with each phase in ms
+    def export(self, path):
+        with open(path, "w", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow([f"{phase}_ms" for phase in self.phases])
+            for row in self.rows():
+                writer.writerow([f"{seconds * 1e3:.4f}" for seconds in row])
@@ -0,0 +1,137 @@
+import pygame
+
+MAX_RECTS = 150  # past this many dirty rects the whole window is repainted instead
+COLORKEY = (255, 0, 255)  # no invader sprite uses this color, the formation layer keys it out
+
+
+# redraws only what changed since the last frame. each frame is a list of
+# (surface, position) in draw order. anything that moved, appeared or went
+# away has its old spot painted over with the background and only those
+# rects are pushed to the display, like pygame.sprite.LayeredDirty
+class DirtyRenderer:
+    def __init__(self, window, background):
+        self.window = window
+        self.background = background
+        self.prev = []  # last frame's (surface, rect), also keeps those surfaces alive
+        self.full = True
+        self.marked = []  # rects to repaint next frame on top of what changed
+
+    # repaint and push the whole window next frame
+    def invalidate(self):
+        self.full = True
+
+    # repaint and push rect next frame. for a surface that was drawn on in
+    # place, which looks unchanged to draw() when it hasn't moved
+    def mark(self, rect):
+        self.marked.append(pygame.Rect(rect))
+
+    def draw(self, items):
+        window = self.window
+        cur = [(surface, pygame.Rect(pos, surface.get_size())) for surface, pos in items]
+        marked, self.marked = self.marked, []
+
+        if not self.full:
+            # the same surface at the same spot as last frame needs nothing done
+            prev_keys = {(id(surface), tuple(rect)) for surface, rect in self.prev}
+            cur_keys = {(id(surface), tuple(rect)) for surface, rect in cur}
+            dirty = [rect for surface, rect in self.prev if (id(surface), tuple(rect)) not in cur_keys]
+            dirty += [rect for surface, rect in cur if (id(surface), tuple(rect)) not in prev_keys]
+            dirty += marked
+            self.prev = cur
+            if not dirty:
+                return
+            # testing every sprite against every dirty rect grows with their product, so with
+            # a big moving formation a full repaint is cheaper
+            self.full = len(dirty) > MAX_RECTS
+
+        if self.full:
+            self.full = False
+            window.blit(self.background, (0, 0))
+            window.blits(cur, False)
+            pygame.display.update()
+            self.prev = cur
+            return
+
+        # repaint each dirty rect from the background up, clipped to it: an item drawn again over
+        # itself would blend its alpha edges twice, and could cover a later item outside the rect
+        rects = [rect for surface, rect in cur]
+        for rect in dirty:
+            window.set_clip(rect)
+            window.blit(self.background, rect, rect)
+            for i in rect.collidelistall(rects):
+                window.blit(*cur[i])
+        window.set_clip(None)
+
+        pygame.display.update(dirty)
+
+
+# the invaders drawn once onto a surface of their own. the formation moves
+# rigidly, so each frame it is one blit instead of one per invader, and a kill
+# only repaints the patch around the invader that died. invader sprites are
+# either fully opaque or fully transparent, so a colorkeyed copy draws exactly
+# the same pixels
+class FormationLayer:
+    def __init__(self, drawable):
+        self.drawable = drawable  # image -> surface to draw it with
+        self.surface = None
+        self.placed = {}  # invader key -> (surface, rect on the layer)
+        self.version = None
+
+    # bring the layer up to date with the state's invaders, true if it changed
+    def update(self, state):
+        version = (state.level, state.enemy_count())
+        if version == self.version:
+            return False
+        formation = state.invaders()
+        if self.version is None or version[0] != self.version[0] or not formation:
+            self.build(formation)
+        else:
+            self.repair(formation)
+        self.version = version
+        return True
+
+    def build(self, formation):
+        drawable = self.drawable
+        placed = [(key, drawable(img), pygame.Rect((x, y), img.get_size())) for key, img, x, y in formation]
+        self.placed = {}
+        self.surface = None
+        if not placed:
+            return
+        left = min(rect.left for key, surface, rect in placed)
+        top = min(rect.top for key, surface, rect in placed)
+        right = max(rect.right for key, surface, rect in placed)
+        bottom = max(rect.bottom for key, surface, rect in placed)
+
+        layer = pygame.Surface((right - left, bottom - top)).convert()
+        layer.fill(COLORKEY)
+        layer.set_colorkey(COLORKEY)
+        for key, surface, rect in placed:
+            rect.move_ip(-left, -top)
+            self.placed[key] = (surface, rect)
+        layer.blits(list(self.placed.values()), False)
+        self.surface = layer
+
+    # paint over the invaders that are gone, then redraw in order whatever overlapped them
+    def repair(self, formation):
+        placed = self.placed
+        alive = {key for key, img, x, y in formation}
+        gone = [placed.pop(key)[1] for key in list(placed) if key not in alive]
+        survivors = list(placed.values())
+        rects = [rect for surface, rect in survivors]
+        layer = self.surface
+        for hole in gone:
+            layer.set_clip(hole)
+            layer.fill(COLORKEY)
+            for i in hole.collidelistall(rects):
+                layer.blit(*survivors[i])
+        layer.set_clip(None)
+
+    # (surface, position) to draw the layer with, or None with no invaders
+    def item(self, state, alpha=1.0):
+        anchor = state.formation_anchor(alpha)
+        if anchor is None or self.surface is None:
+            return None
+        key, x, y = anchor
+        rect = self.placed[key][1]
+        screen = pygame.Rect((x, y), rect.size)
+        return self.surface, (screen.x - rect.x, screen.y - rect.y)
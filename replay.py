@@ -0,0 +1,108 @@
+import argparse
+import struct
+import time
+
+from engine import BACKENDS, new_game, use_dummy_drivers
+
+# file layout: a header, then the inputs run-length encoded one byte per run.
+# the low 3 bits are the LEFT/RIGHT/FIRE bitmask and the high 5 bits how many
+# steps in a row it was held (1 to 31), so a game costs at most a byte a step
+MAGIC = b"SIRP"
+VERSION = 2  # 2: enemy fire is scheduled, so old inputs no longer replay the same game
+HEADER = struct.Struct("<4sBBQ")  # magic, version, difficulty, seed
+MAX_RUN = 31
+
+
+class ReplayError(Exception):
+    pass
+
+
+# streams one game's inputs to disk as it is played
+class ReplayWriter:
+    def __init__(self, path, difficulty, seed):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, difficulty, seed))
+        self.actions = None
+        self.run = 0
+        self.frames = 0
+
+    # call once per GameState.step with the same actions
+    def record(self, actions):
+        self.frames += 1
+        if actions == self.actions and self.run < MAX_RUN:
+            self.run += 1
+            return
+        self.flush_run()
+        self.actions = actions
+        self.run = 1
+
+    def flush_run(self):
+        if self.run:
+            self.file.write(bytes((self.run << 3 | self.actions,)))
+
+    def close(self):
+        if not self.file.closed:
+            self.flush_run()
+            self.run = 0
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Replay:
+    def __init__(self, difficulty, seed, runs):
+        self.difficulty = difficulty
+        self.seed = seed
+        self.runs = runs  # [(actions, steps)]
+        self.frames = sum(steps for actions, steps in runs)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as replay_file:
+            data = replay_file.read()
+        if len(data) < HEADER.size:
+            raise ReplayError(f"{path} is too short to be a replay")
+        magic, version, difficulty, seed = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ReplayError(f"{path} is not a version {VERSION} replay")
+        runs = [(byte & 7, byte >> 3) for byte in data[HEADER.size:]]
+        if any(steps == 0 for actions, steps in runs):
+            raise ReplayError(f"{path} is corrupt")
+        return cls(difficulty, seed, runs)
+
+    # every step's actions in order
+    def actions(self):
+        for actions, steps in self.runs:
+            for _ in range(steps):
+                yield actions
+
+    # a fresh game stepped through the recorded inputs, up to frame if given
+    def play(self, backend="objects", frame=None):
+        state = new_game(self.difficulty, backend, self.seed)
+        for actions in self.actions():
+            if state.over or (frame is not None and state.frame >= frame):
+                break
+            state.step(actions)
+        return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-run a recorded game headless at full speed.")
+    parser.add_argument("replay")
+    parser.add_argument("--frame", type=int, help="stop at this frame instead of the end")
+    parser.add_argument("--backend", choices=BACKENDS, default="objects")
+    args = parser.parse_args()
+
+    use_dummy_drivers()
+    replay = Replay.load(args.replay)
+    begin = time.perf_counter()
+    state = replay.play(args.backend, args.frame)
+    elapsed = time.perf_counter() - begin
+    print(f"difficulty {replay.difficulty}, seed {replay.seed}, {replay.frames} frames in {len(replay.runs)} runs")
+    print(f"frame {state.frame}: level {state.level}, score {state.score}, lives {state.lives}, "
+          f"{state.enemy_count()} invaders, over {state.over}")
+    print(f"replayed in {elapsed:.2f}s ({state.frame / max(elapsed, 1e-9):.0f} frames/s)")
@@ -0,0 +1,37 @@
+# one screen of the game. run() blocks until the screen is done and returns
+# the scene to show next, or None to quit. anything the scene holds on to
+# is dropped in exit() so a finished screen can be garbage collected
+class Scene:
+    name = "scene"
+
+    def enter(self):
+        pass
+
+    def run(self):
+        return None
+
+    def exit(self):
+        pass
+
+
+# runs scenes one after another from a single loop, so switching screens never
+# grows the call stack the way screens calling each other directly did
+class SceneManager:
+    def __init__(self):
+        self.scene = None
+        self.transitions = 0
+        self.hooks = []  # called with each scene after it is entered
+
+    def run(self, scene):
+        while scene is not None:
+            self.scene = scene
+            scene.enter()
+            for hook in self.hooks:
+                hook(scene)
+            try:
+                next_scene = scene.run()
+            finally:
+                scene.exit()
+            self.scene = None
+            self.transitions += 1
+            scene = next_scene
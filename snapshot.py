@@ -0,0 +1,160 @@
+import argparse
+import json
+import random
+import struct
+import sys
+import time
+
+# file layout: a header, the random generator's state words, then the rest
+# of the snapshot as JSON. the generator's state is most of a snapshot and is
+# random, so it is stored as raw 32 bit words rather than text
+MAGIC = b"SISN"
+VERSION = 1
+HEADER = struct.Struct("<4sBH")  # magic, version, number of generator words
+
+
+class SnapshotError(Exception):
+    pass
+
+
+# everything needed to carry on a game, as plain numbers, tuples and lists.
+# no Surface or Mask is copied: invaders and lasers are stored by color and
+# their images are looked up again on restore. see GameState.snapshot/restore.
+# the waves aren't part of it, a game is restored with the WaveSet it was played with
+class Snapshot:
+    __slots__ = ("game", "rng", "player", "formation", "enemies", "lasers", "fire")
+
+    def __init__(self, game, rng, player, formation, enemies, lasers, fire):
+        self.game = game  # GameState fields, see engine.GAME_FIELDS
+        self.rng = rng  # random.Random.getstate()
+        self.player = player  # see engine.PLAYER_FIELDS
+        self.formation = formation  # Formation.getstate()
+        self.enemies = enemies  # [(row, col, kind, frame of its last shot)] in spawn order
+        self.lasers = lasers  # [(x, y, kind, fired by an invader)] in the order they were fired
+        self.fire = fire  # the fire scheduler's heap as [(frame, spawn order)]
+
+    def fields(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    def __eq__(self, other):
+        return isinstance(other, Snapshot) and self.fields() == other.fields()
+
+    def to_bytes(self):
+        rng_version, words, gauss = self.rng
+        rest = [rng_version, gauss, self.game, self.player, self.formation, self.enemies, self.lasers, self.fire]
+        return (HEADER.pack(MAGIC, VERSION, len(words)) + struct.pack(f"<{len(words)}I", *words) +
+                json.dumps(rest, separators=(",", ":")).encode())
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise SnapshotError("too short to be a snapshot")
+        magic, version, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError(f"not a version {VERSION} snapshot")
+        try:
+            words = struct.unpack_from(f"<{count}I", data, HEADER.size)
+            rest = json.loads(data[HEADER.size + 4 * count:])
+            rng_version, gauss, game, player, formation, enemies, lasers, fire = rest
+        except (struct.error, ValueError) as error:
+            raise SnapshotError(f"corrupt snapshot: {error}")
+        # JSON has no tuples, put back the ones the game compares or unpacks as tuples
+        return cls(tuple(game), (rng_version, words, gauss), tuple(player), tuple(formation),
+                   [tuple(enemy) for enemy in enemies], [tuple(laser) for laser in lasers],
+                   [tuple(entry) for entry in fire])
+
+    def save(self, path):
+        with open(path, "wb") as snapshot_file:
+            snapshot_file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as snapshot_file:
+            data = snapshot_file.read()
+        try:
+            return cls.from_bytes(data)
+        except SnapshotError as error:
+            raise SnapshotError(f"{path}: {error}")
+
+
+# what a lookahead can compare two games by, the same on both backends
+def outcome(state):
+    enemies, lasers = state.features()
+    return (state.frame, state.level, state.lives, state.score, state.player.x, state.player.health,
+            [tuple(row) for row in enemies.tolist()] if hasattr(enemies, "tolist") else enemies,
+            [tuple(row) for row in lasers.tolist()] if hasattr(lasers, "tolist") else lasers)
+
+
+# play random games, and at random frames check that a fork, a restore from
+# bytes and a restore on the other backend all step exactly like the game
+# they came from for the next `ahead` frames
+def round_trip(games, difficulty, ahead, waves=None):
+    from engine import BACKENDS, new_game, restore_game, random_policy
+    checks = 0
+    for game in range(games):
+        rng = random.Random(game)
+        policy = random_policy(rng)
+        for backend in BACKENDS:
+            other = [name for name in BACKENDS if name != backend][0]
+            state = new_game(difficulty, backend, seed=game, waves=waves)
+            while not state.over:
+                if rng.random() < 0.01:
+                    snapshot = state.snapshot()
+                    copies = [("fork", state.fork()),
+                              ("bytes", restore_game(Snapshot.from_bytes(snapshot.to_bytes()), backend, waves)),
+                              (other, restore_game(snapshot, other, waves))]
+                    if state.snapshot() != snapshot:
+                        print(f"game {game} {backend} frame {state.frame}: taking a snapshot changed the game")
+                        return False
+                    for _ in range(ahead):
+                        actions = policy(state)
+                        state.step(actions)
+                        for name, copy in copies:
+                            copy.step(actions)
+                    for name, copy in copies:
+                        if outcome(copy) != outcome(state):
+                            print(f"game {game} {backend} frame {state.frame}: the {name} copy went its own way")
+                            return False
+                    checks += 1
+                state.step(policy(state))
+    print(f"{checks} snapshots restored three ways, each stepped {ahead} frames exactly like the original")
+    return True
+
+
+# snapshot, fork and serialize rates in the middle of a busy game
+def throughput(difficulty, backend, seconds=1.0, waves=None):
+    from engine import FIRE, new_game, random_policy
+    state = new_game(difficulty, backend, seed=0, waves=waves)
+    state.lives = 10 ** 9
+    policy = random_policy(random.Random(0))
+    while state.frame < 600:
+        state.step(policy(state) | FIRE)
+    snapshot = state.snapshot()
+    data = snapshot.to_bytes()
+    tests = (("snapshot", state.snapshot), ("fork", state.fork), ("to_bytes", snapshot.to_bytes),
+             ("from_bytes", lambda: Snapshot.from_bytes(data)))
+    print(f"{backend}: {state.enemy_count()} invaders, {len(snapshot.lasers)} lasers, {len(data)} bytes serialized")
+    for name, func in tests:
+        count = 0
+        begin = time.perf_counter()
+        while time.perf_counter() - begin < seconds:
+            for _ in range(100):
+                func()
+            count += 100
+        elapsed = time.perf_counter() - begin
+        print(f"  {name:<10} {count / elapsed:>9.0f} per second")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and time game snapshots.")
+    parser.add_argument("--games", type=int, default=10, help="random games to check snapshots in")
+    parser.add_argument("--difficulty", type=int, default=1)
+    parser.add_argument("--ahead", type=int, default=120, help="frames each restored copy is stepped")
+    args = parser.parse_args()
+
+    from engine import BACKENDS, use_dummy_drivers
+    use_dummy_drivers()
+    for name in BACKENDS:
+        throughput(args.difficulty, name)
+    if not round_trip(args.games, args.difficulty, args.ahead):
+        sys.exit(1)
@@ -0,0 +1,561 @@
+import argparse
+import asyncio
+import collections
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+ADDRESS = "127.0.0.1:8765"  # where games are broadcast, "unix:PATH" for a unix domain socket
+BUFFER = 120  # messages queued for one spectator before it is dropped back to a keyframe, 2 seconds of play
+SEND_BUFFER = 16384  # bytes the kernel and the transport may each hold for one spectator
+RECONNECT = 1.0  # seconds a viewer waits before connecting again
+VALUES = ("frame", "level", "lives", "score", "player", "offset", "laser_vel", "start", "lost")  # sent when changed
+
+# the stream is one JSON object per line. a keyframe ("t": "k") has every
+# value in VALUES plus all the invaders, as [id, x, y, kind] relative to the
+# formation's offset, and all the lasers as [x, y, kind, fired by an invader].
+# a delta ("t": "d") has the values that changed, the ids of invaders killed
+# ("kill"), the places in the old laser list of lasers that are gone ("gone")
+# and the lasers fired ("new"). every other laser moved laser_vel, up for the
+# player's and down for the invaders', so moves cost nothing to send
+
+
+# a game's entities as a spectator sees them, kept up to date from the stream
+class World:
+    def __init__(self):
+        self.values = None  # None until the first keyframe
+        self.enemies = {}  # id -> [x, y, kind]
+        self.lasers = []
+        self.keyframes = 0
+
+    def apply(self, message):
+        if message["t"] == "k":
+            self.values = {name: message[name] for name in VALUES}
+            self.enemies = {enemy[0]: enemy[1:] for enemy in message["enemies"]}
+            self.lasers = list(message["lasers"])
+            self.keyframes += 1
+            return
+        values = self.values
+        for name in VALUES:
+            if name in message:
+                values[name] = message[name]
+        for key in message.get("kill", ()):
+            del self.enemies[key]
+        vel = values["laser_vel"]
+        gone = set(message.get("gone", ()))
+        lasers = [(x, y + vel if enemy else y - vel, kind, enemy)
+                  for i, (x, y, kind, enemy) in enumerate(self.lasers) if i not in gone]
+        lasers += message.get("new", ())
+        self.lasers = lasers
+
+    def keyframe(self):
+        message = dict(self.values, t="k")
+        message["enemies"] = [[key] + enemy for key, enemy in self.enemies.items()]
+        message["lasers"] = self.lasers
+        return message
+
+    # what the viewer draws, in the shape render.FormationLayer reads from a game
+    @property
+    def level(self):
+        return self.values["level"]
+
+    def enemy_count(self):
+        return len(self.enemies)
+
+    def invaders(self):
+        from engine import KIND_SHIPS
+        ox, oy = self.values["offset"]
+        return [(key, KIND_SHIPS[kind], x + ox, y + oy) for key, (x, y, kind) in self.enemies.items()]
+
+    def formation_anchor(self, alpha=1.0):
+        if not self.enemies:
+            return None
+        key, (x, y, kind) = next(iter(self.enemies.items()))
+        ox, oy = self.values["offset"]
+        return key, x + ox, y + oy
+
+
+# turns a game into the stream, frame by frame. called from the game loop, so
+# it only looks at what changed: the lasers, and the invaders when there are fewer
+class Tracker:
+    def __init__(self):
+        self.state = None  # game the last message was about
+        self.layout = None  # its formation's column list, a new one means a new wave
+        self.values = {}
+        self.count = 0  # invaders left
+        self.ids = set()
+        self.lasers = []
+
+    def update(self, state):
+        formation = state.formation
+        values = self.read_values(state)
+        lasers = state.laser_rows()
+        if state is not self.state or formation.col_x is not self.layout or formation.count > self.count:
+            message = dict(values, t="k")
+            message["enemies"] = self.read_enemies(state)
+            message["lasers"] = lasers
+            self.state = state
+            self.layout = formation.col_x
+            self.ids = {enemy[0] for enemy in message["enemies"]}
+        else:
+            message = {name: value for name, value in values.items() if value != self.values[name]}
+            message["t"] = "d"
+            if formation.count != self.count:
+                ids = {row * len(formation.col_x) + col for row, col, kind in state.invader_rows()}
+                message["kill"] = sorted(self.ids - ids)
+                self.ids = ids
+            gone, new = diff_lasers(self.lasers, lasers, state.laser_vel)
+            if gone:
+                message["gone"] = gone
+            if new:
+                message["new"] = new
+        self.values = values
+        self.count = formation.count
+        self.lasers = lasers
+        return message
+
+    @staticmethod
+    def read_values(state):
+        player = state.player
+        return {"frame": state.frame, "level": state.level, "lives": state.lives, "score": state.score,
+                "player": [player.x, player.y, player.health], "offset": [state.formation.x, state.formation.y],
+                "laser_vel": state.laser_vel, "start": state.start, "lost": state.lost}
+
+    @staticmethod
+    def read_enemies(state):
+        formation = state.formation
+        col_x, row_y = formation.col_x, formation.row_y
+        return [[row * len(col_x) + col, col_x[col], row_y[row], kind] for row, col, kind in state.invader_rows()]
+
+
+# (places in old of the lasers that are gone, lasers fired since) going from
+# old to new. lasers keep their order and new ones go on the end, so one pass
+# matches each old laser, moved, against the next new one
+def diff_lasers(old, new, vel):
+    gone = []
+    j = 0
+    for i, (x, y, kind, enemy) in enumerate(old):
+        if j < len(new) and new[j] == (x, y + vel if enemy else y - vel, kind, enemy):
+            j += 1
+        else:
+            gone.append(i)
+    return gone, new[j:]
+
+
+def encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+# "unix:PATH" or "[host:]port"
+def parse_address(address):
+    if address.startswith("unix:"):
+        return "unix", address[5:]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+# one connected spectator. messages wait in a bounded queue, and one that
+# can't keep up loses what is queued and gets a keyframe once it catches up,
+# so a slow viewer costs a little memory and never holds anyone else up
+class Spectator:
+    def __init__(self, writer, limit):
+        self.writer = writer
+        self.limit = limit
+        self.queue = collections.deque()
+        self.wake = asyncio.Event()
+        self.behind = True  # needs a keyframe before any more deltas, true until the first one
+        self.closing = False  # send what is queued, then hang up
+        self.task = None
+        self.resyncs = 0
+
+    def push(self, line):
+        if not self.behind:
+            if len(self.queue) < self.limit:
+                self.queue.append(line)
+            else:
+                self.queue.clear()
+                self.behind = True
+                self.resyncs += 1
+        self.wake.set()
+
+    async def run(self, world):
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            if self.behind:
+                if world.values is None:
+                    if self.closing:
+                        return
+                    continue
+                # the world is up to date with every message pushed so far, so deltas carry on from here
+                self.queue.clear()
+                self.behind = False
+                data = encode(world.keyframe())
+            else:
+                data = b"".join(self.queue)
+                self.queue.clear()
+            self.writer.write(data)
+            await self.writer.drain()
+            if self.closing and not self.queue and not self.behind:
+                return
+
+
+# publishes games to any number of spectators over a local socket. the
+# sockets are served by an asyncio loop on a thread of its own: publish()
+# only diffs the frame and hands the message over, so the game loop never
+# waits on a spectator
+class Broadcaster:
+    def __init__(self, address=ADDRESS, limit=BUFFER):
+        self.address = address
+        self.limit = limit
+        self.tracker = Tracker()
+        self.world = World()  # what spectators have been sent, keyframes for new or lagging ones come from it
+        self.spectators = set()
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.error = None
+        self.messages = 0
+        self.bytes = 0
+        self.resyncs = 0  # times a spectator fell behind
+
+    # start serving, false if the address can't be listened on
+    def start(self):
+        self.thread = threading.Thread(target=self.serve, name="spectate", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            print(f"Spectators can't connect on {self.address}: {self.error}")
+            return False
+        return True
+
+    def serve(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        try:
+            self.server = loop.run_until_complete(self.listen())
+        except (OSError, ValueError) as error:
+            self.error = error
+            self.loop = None  # publish() does nothing
+            self.ready.set()
+            loop.close()
+            return
+        self.ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self.server.close()
+            tasks = asyncio.all_tasks(loop)  # spectators that didn't take everything in time
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop = None
+            loop.close()
+
+    async def listen(self):
+        kind, where = parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(where):
+                os.remove(where)  # left over from a run that didn't close it
+            return await asyncio.start_unix_server(self.subscribe, where)
+        server = await asyncio.start_server(self.subscribe, *where)
+        if where[1] == 0:  # port picked by the system
+            self.address = "%s:%d" % server.sockets[0].getsockname()[:2]
+        return server
+
+    async def subscribe(self, reader, writer):
+        # the kernel would otherwise buffer megabytes for a spectator that isn't reading
+        writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        writer.transport.set_write_buffer_limits(SEND_BUFFER)
+        spectator = Spectator(writer, self.limit)
+        spectator.task = asyncio.current_task()
+        self.spectators.add(spectator)
+        spectator.wake.set()
+        try:
+            await spectator.run(self.world)
+            writer.close()
+            await writer.wait_closed()  # until everything written has gone out
+        except (ConnectionError, OSError, asyncio.CancelledError):
+            pass
+        finally:
+            self.spectators.discard(spectator)
+            self.resyncs += spectator.resyncs
+            writer.close()
+
+    # called by the game after every step
+    def publish(self, state):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.deliver, self.tracker.update(state))
+
+    def deliver(self, message):
+        self.world.apply(message)
+        line = encode(message)
+        self.messages += 1
+        self.bytes += len(line)
+        for spectator in self.spectators:
+            spectator.push(line)
+
+    # stop taking spectators, give the ones watching up to timeout seconds to
+    # receive everything published so far, then hang up on them all
+    async def shutdown(self, timeout):
+        self.server.close()
+        tasks = [spectator.task for spectator in self.spectators]
+        for spectator in self.spectators:
+            spectator.closing = True
+            spectator.wake.set()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        self.loop.stop()
+
+    def close(self, timeout=2.0):
+        if self.loop is not None and self.thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self.shutdown(timeout), self.loop)
+            self.thread.join(timeout + 3)
+        kind, where = parse_address(self.address)
+        if kind == "unix" and os.path.exists(where):
+            os.remove(where)
+
+
+# a socket to the broadcaster, read without blocking. None if nothing is listening
+def connect(address):
+    kind, where = parse_address(address)
+    sock = socket.socket(socket.AF_UNIX if kind == "unix" else socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.connect(where)
+    except OSError:
+        sock.close()
+        return None
+    sock.setblocking(False)
+    return sock
+
+
+# every whole message that has arrived, [] if none, None once the connection is gone
+def receive(sock, pending):
+    data = []
+    while True:
+        try:
+            chunk = sock.recv(65536)
+        except BlockingIOError:
+            break
+        except OSError:
+            return None
+        if not chunk:
+            return None
+        data.append(chunk)
+    if not data:
+        return []
+    pending += b"".join(data)
+    *lines, rest = pending.split(b"\n")
+    pending[:] = rest
+    return [json.loads(line) for line in lines]
+
+
+# a window drawing whatever game is being broadcast on address
+def view(address):
+    import pygame
+    from engine import WIDTH, HEIGHT, FPS, YELLOW_SPACE_SHIP, KIND_LASERS
+    from render import DirtyRenderer, FormationLayer
+    from sprites import SPRITES
+    from text import label
+
+    pygame.init()
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(f"Space Invaders - spectating {address}")
+    background = SPRITES.load_scaled(os.path.join("assets", "background-black.png"), (WIDTH, HEIGHT)).convert()
+    renderer = DirtyRenderer(window, background)
+    drawable = SPRITES.drawable
+    clock = pygame.time.Clock()
+    world = World()
+    layer = None
+    keyframes = 0
+    sock = None
+    pending = bytearray()
+    retry = 0
+
+    while True:
+        clock.tick(FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                if sock is not None:
+                    sock.close()
+                pygame.quit()
+                return
+
+        if sock is None and time.monotonic() >= retry:
+            sock = connect(address)
+            retry = time.monotonic() + RECONNECT
+            pending.clear()
+        messages = receive(sock, pending) if sock is not None else []
+        if messages is None:
+            sock.close()
+            sock = None
+            world = World()  # the next connection starts with a keyframe
+            messages = []
+        for message in messages:
+            world.apply(message)
+
+        if world.values is None:
+            waiting = label(f"Waiting for a game on {address}", "arial", 40)
+            renderer.draw([(waiting, (WIDTH / 2 - waiting.get_width() / 2, 350))])
+            continue
+
+        # a keyframe may be a new game, draw the formation from scratch
+        if world.keyframes != keyframes:
+            keyframes = world.keyframes
+            layer = FormationLayer(drawable)
+            renderer.invalidate()
+        values = world.values
+        lives_label = label(f"Lives: {values['lives']}", "arial", 50)
+        level_label = label(f"Level: {values['level']}", "arial", 50)
+        score_label = label(f"Score: {values['score']}", "arial", 50)
+        items = [(lives_label, (10, HEIGHT - 10 - lives_label.get_height())),
+                 (level_label, (WIDTH - level_label.get_width() - 10, HEIGHT - 10 - level_label.get_height())),
+                 (score_label, (10, 10))]
+        x, y, health = values["player"]
+        items.append((drawable(YELLOW_SPACE_SHIP), (x, y)))
+        changed = layer.update(world)
+        formation = layer.item(world)
+        if formation is not None:
+            if changed:
+                surface, pos = formation
+                renderer.mark(surface.get_rect(topleft=pos))
+            items.append(formation)
+        for x, y, kind, enemy in world.lasers:
+            items.append((drawable(KIND_LASERS[kind]), (x, y)))
+        if values["start"]:
+            start_label = label("Start", "arial", 60)
+            items.append((start_label, (WIDTH / 2 - start_label.get_width() / 2, 350)))
+        if values["lost"]:
+            lost_label = label("Game Over", "arial", 60)
+            items.append((lost_label, (WIDTH / 2 - lost_label.get_width() / 2, 350)))
+        renderer.draw(items)
+
+
+# what a spectator should see of a game, to check a World against
+def truth(state):
+    enemies, lasers = state.features()
+    if hasattr(enemies, "tolist"):
+        enemies, lasers = enemies.tolist(), lasers.tolist()
+    return ([tuple(enemy) for enemy in enemies], [tuple(laser) for laser in lasers],
+            (state.player.x, state.player.y, state.player.health, state.lives, state.score, state.level))
+
+
+def seen(world):
+    values = world.values
+    ox, oy = values["offset"]
+    x, y, health = values["player"]
+    return ([(ex + ox, ey + oy, kind) for ex, ey, kind in world.enemies.values()],
+            [(lx, ly, kind) for lx, ly, kind, enemy in world.lasers],
+            (x, y, health, values["lives"], values["score"], values["level"]))
+
+
+# a blocking socket reading everything sent to it on a thread, optionally
+# stalling first with a small receive buffer, so the broadcaster has to drop
+# it back to a keyframe
+class TestSpectator:
+    def __init__(self, address, stall=0.0):
+        where = parse_address(address)[1]  # the check listens on tcp
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if stall:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        self.sock.connect(where)
+        self.stall = stall
+        self.data = bytearray()
+        self.thread = threading.Thread(target=self.read, daemon=True)
+        self.thread.start()
+
+    def read(self):
+        time.sleep(self.stall)
+        while True:
+            try:
+                chunk = self.sock.recv(65536)
+            except OSError:
+                chunk = b""
+            if not chunk:
+                self.sock.close()
+                return
+            self.data += chunk
+
+    # what was seen, once the broadcaster has hung up
+    def world(self, timeout=10.0):
+        self.thread.join(timeout)
+        world = World()
+        for line in bytes(self.data).splitlines():
+            world.apply(json.loads(line))
+        return world
+
+
+# play random games while spectators watch, and check that every frame
+# rebuilt from the stream matches the game, and that fast, stalled and late
+# spectators all end up seeing the last frame
+def check(games, difficulty, spectators, waves=None):
+    from engine import BACKENDS, new_game, random_policy
+    broadcaster = Broadcaster("127.0.0.1:0")
+    if not broadcaster.start():
+        return False
+    watchers = [TestSpectator(broadcaster.address) for _ in range(spectators)]
+    watchers.append(TestSpectator(broadcaster.address, stall=1.0))
+    ok = True
+    frames = 0
+    publish = []
+    for game in range(games):
+        for backend in BACKENDS:
+            state = new_game(difficulty, backend, seed=game, waves=waves)
+            policy = random_policy(random.Random(game))
+            world = World()
+            while not state.over:
+                state.step(policy(state))
+                begin = time.perf_counter()
+                message = broadcaster.tracker.update(state)
+                broadcaster.loop.call_soon_threadsafe(broadcaster.deliver, message)
+                publish.append(time.perf_counter() - begin)
+                world.apply(json.loads(encode(message)))
+                frames += 1
+                if ok and seen(world) != truth(state):
+                    print(f"game {game} {backend} frame {state.frame}: the stream shows something else")
+                    ok = False
+    watchers.append(TestSpectator(broadcaster.address))  # late, it only ever gets a keyframe
+    # the last one is connected, but hasn't been taken on until the broadcaster counts it
+    wait_until = time.monotonic() + 5
+    while len(broadcaster.spectators) < len(watchers) and time.monotonic() < wait_until:
+        time.sleep(0.01)
+    broadcaster.close(timeout=10)
+    final = encode(broadcaster.world.keyframe())
+    for i, watcher in enumerate(watchers):
+        try:
+            seen_last = encode(watcher.world().keyframe()) == final
+        except (ValueError, KeyError, TypeError):  # a cut off or garbled stream
+            seen_last = False
+        if not seen_last:
+            print(f"spectator {i} didn't end up on the last frame")
+            ok = False
+    publish.sort()
+    print(f"{frames} frames to {len(watchers)} spectators, {broadcaster.bytes / max(broadcaster.messages, 1):.0f} "
+          f"bytes a message, {broadcaster.resyncs} resyncs")
+    p50, p99 = publish[len(publish) // 2], publish[len(publish) * 99 // 100]
+    print(f"publish: p50 {p50 * 1e6:.0f} us, p99 {p99 * 1e6:.0f} us, max {publish[-1] * 1e6:.0f} us")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch a game broadcast by main.py --spectate.")
+    parser.add_argument("address", nargs="?", default=ADDRESS, help="[host:]port or unix:PATH")
+    parser.add_argument("--check", action="store_true", help="check the stream against headless games instead")
+    parser.add_argument("--games", type=int, default=3, help="random games to --check with")
+    parser.add_argument("--spectators", type=int, default=24, help="spectators to --check with")
+    args = parser.parse_args()
+
+    if args.check:
+        from engine import use_dummy_drivers
+        use_dummy_drivers()
+        if not check(args.games, 1, args.spectators):
+            sys.exit(1)
+    else:
+        view(args.address)
@@ -0,0 +1,153 @@
+import hashlib
+import io
+import os
+import struct
+
+import pygame
+
+ASSETS = "assets"
+CACHE_DIR = os.path.join(ASSETS, "cache")  # pre-scaled images, safe to delete
+CACHE_VERSION = 1  # bump when the cached layout or the scaling changes
+CACHE_HEADER = struct.Struct("<II")  # width, height, then RGBA bytes
+CACHE_MAX_BYTES = 256 * 1024  # bigger images load faster from their compressed file than from a raw copy
+ATLAS_WIDTH = 512
+
+
+# one image plus the collision mask and bounding rect every entity using it shares
+class Sprite:
+    def __init__(self, image):
+        self.image = image
+        self.mask = pygame.mask.from_surface(image)
+        self.rect = image.get_rect()
+
+
+# loads each image once and builds its mask once, so spawning an invader or
+# firing a laser only looks the mask up instead of rebuilding it. scaled images
+# are cached on disk keyed by a hash of the source file, and the copies that
+# get drawn live in one atlas in the display's pixel format
+class SpriteRegistry:
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.images = {}  # name -> Surface
+        self.sources = {}  # name -> (filename, size)
+        self.sprites = {}  # Surface -> Sprite, built on first use or by warm()
+        self.cache_dir = cache_dir  # None turns the disk cache off
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.atlas = None  # built on the first drawable() call once a display exists
+        self.drawables = {}  # Surface -> its subsurface of the atlas
+
+    # load an image from the assets folder, optionally scaled to size
+    def load(self, name, filename, size=None):
+        image = self.load_scaled(os.path.join(ASSETS, filename), size)
+        self.images[name] = image
+        self.sources[name] = (filename, size)
+        return image
+
+    # an image file scaled to size. the result is cached on disk, so while the
+    # file stays the same it is neither decoded nor scaled again
+    def load_scaled(self, path, size=None):
+        with open(path, "rb") as source:
+            data = source.read()
+        cache_path = None
+        if self.cache_dir is not None and (size is None or size[0] * size[1] * 4 <= CACHE_MAX_BYTES):
+            key = hashlib.sha1(data + repr((size, CACHE_VERSION)).encode()).hexdigest()
+            cache_path = os.path.join(self.cache_dir, key + ".rgba")
+            image = self.read_cached(cache_path)
+            if image is not None:
+                self.cache_hits += 1
+                return image
+
+        self.cache_misses += 1
+        image = pygame.image.load(io.BytesIO(data), path)
+        if size is not None:
+            image = pygame.transform.scale(image, size)
+        if cache_path is not None and image.get_width() * image.get_height() * 4 <= CACHE_MAX_BYTES:
+            self.write_cached(cache_path, image)
+        return image
+
+    def read_cached(self, cache_path):
+        try:
+            with open(cache_path, "rb") as cached:
+                data = cached.read()
+            width, height = CACHE_HEADER.unpack_from(data)
+            return pygame.image.fromstring(data[CACHE_HEADER.size:], (width, height), "RGBA")
+        except (OSError, ValueError, struct.error):  # missing or damaged, load from the source instead
+            return None
+
+    # written to a temporary file first so a half written entry is never read
+    def write_cached(self, cache_path, image):
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, "wb") as cached:
+                cached.write(CACHE_HEADER.pack(*image.get_size()))
+                cached.write(pygame.image.tostring(image, "RGBA"))
+            os.replace(temp_path, cache_path)
+        except OSError:
+            print("Sprite cache could not be written.")
+            self.cache_dir = None
+
+    def sprite(self, image):
+        sprite = self.sprites.get(image)
+        if sprite is None:
+            sprite = self.sprites[image] = Sprite(image)
+        return sprite
+
+    def mask(self, image):
+        return self.sprite(image).mask
+
+    def rect(self, image):
+        return self.sprite(image).rect
+
+    # build every mask up front so nothing is built mid game
+    def warm(self):
+        for image in self.images.values():
+            self.sprite(image)
+
+    # pack every image into one surface converted to the display's pixel format
+    # (shelves, tallest first), so drawing a sprite is a straight copy instead of
+    # a pixel format conversion on every blit. needs a display mode set
+    def build_atlas(self):
+        images = sorted(set(self.images.values()), key=lambda image: -image.get_height())
+        positions = []
+        x = y = shelf = 0
+        for image in images:
+            w, h = image.get_size()
+            if x + w > ATLAS_WIDTH:
+                x, y, shelf = 0, y + shelf + 1, 0
+            positions.append((image, pygame.Rect(x, y, w, h)))
+            x += w + 1
+            shelf = max(shelf, h)
+
+        atlas = pygame.Surface((ATLAS_WIDTH, y + shelf), pygame.SRCALPHA)
+        for image, rect in positions:
+            atlas.blit(image, rect)
+        self.atlas = atlas.convert_alpha()
+        self.drawables = {image: self.atlas.subsurface(rect) for image, rect in positions}
+
+    # the copy of image to draw with. the image itself until a display exists,
+    # or if it didn't come from this registry
+    def drawable(self, image):
+        drawable = self.drawables.get(image)
+        if drawable is not None:
+            return drawable
+        if self.atlas is None and pygame.display.get_surface() is not None:
+            self.build_atlas()
+            return self.drawables.get(image, image)
+        return image
+
+
+SPRITES = SpriteRegistry()
+
+RED_SPACE_SHIP = SPRITES.load("red_ship", "red_spaceship.png")
+GREEN_SPACE_SHIP = SPRITES.load("green_ship", "green_spaceship.png")
+BLUE_SPACE_SHIP = SPRITES.load("blue_ship", "blue_spaceship.png")
+
+# Player ship
+YELLOW_SPACE_SHIP = SPRITES.load("yellow_ship", "yellow_spaceship.png", (50, 50))
+
+# Lasers
+RED_LASER = SPRITES.load("red_laser", "red_laser.png", (50, 60))
+GREEN_LASER = SPRITES.load("green_laser", "green_laser.png", (50, 60))
+BLUE_LASER = SPRITES.load("blue_laser", "blue_laser.png", (50, 60))
+YELLOW_LASER = SPRITES.load("yellow_laser", "yellow_laser.png", (50, 60))
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+
+import pygame
+
+WHITE = (255, 255, 255)
+
+
+# resolves each (face, size) with SysFont once. SysFont scans the system
+# fonts, which is far too slow to do every frame
+class FontManager:
+    def __init__(self):
+        self.fonts = {}
+
+    def font(self, face, size):
+        font = self.fonts.get((face, size))
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = self.fonts[(face, size)] = pygame.font.SysFont(face, size)
+        return font
+
+
+# least recently used cache of rendered text surfaces. a label whose text
+# and color did not change comes back as the very same surface
+class LabelCache:
+    def __init__(self, fonts, max_size=256):
+        self.fonts = fonts
+        self.max_size = max_size
+        self.labels = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, face, size, color=WHITE):
+        key = (text, face, size, color)
+        label = self.labels.get(key)
+        if label is not None:
+            self.labels.move_to_end(key)
+            self.hits += 1
+            return label
+
+        self.misses += 1
+        label = self.labels[key] = self.fonts.font(face, size).render(text, 1, color)
+        if len(self.labels) > self.max_size:
+            self.labels.popitem(last=False)
+        return label
+
+    def clear(self):
+        self.labels.clear()
+
+
+FONTS = FontManager()
+LABELS = LabelCache(FONTS)
+
+
+def label(text, face, size, color=WHITE):
+    return LABELS.render(text, face, size, color)
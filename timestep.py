@@ -0,0 +1,37 @@
+import time
+
+MAX_STEPS = 5  # most simulation steps run for one drawn frame before time is dropped
+
+
+# decouples the simulation rate from the drawing rate. real time is
+# accumulated and spent in fixed steps, whatever is left over becomes the
+# interpolation factor between the last two simulation steps
+class FixedTimestep:
+    def __init__(self, rate, max_steps=MAX_STEPS, clock=time.perf_counter):
+        self.dt = 1 / rate
+        self.max_steps = max_steps
+        self.clock = clock
+        self.accumulator = 0.0
+        self.last = None
+        self.dropped = 0.0  # seconds skipped because the game fell too far behind
+
+    # number of simulation steps due since the last call
+    def advance(self):
+        now = self.clock()
+        if self.last is None:  # first frame runs exactly one step
+            self.last = now
+            return 1
+        self.accumulator += now - self.last
+        self.last = now
+
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:  # don't try to catch up forever after a long stall
+            self.dropped += (steps - self.max_steps) * self.dt
+            self.accumulator -= (steps - self.max_steps) * self.dt
+            steps = self.max_steps
+        self.accumulator -= steps * self.dt
+        return steps
+
+    # how far between the previous and the current step to draw, 0 to 1
+    def alpha(self):
+        return min(self.accumulator / self.dt, 1.0)
@@ -0,0 +1,115 @@
+import json
+import math
+
+WAVES_FILE = "waves.json"
+COLORS = ("blue", "green", "red")  # invader colors, also the order stress rows cycle through
+FORMATION_WIDTH = 650  # how wide the classic formation is, stress formations are squeezed into the same space
+FORMATION_HEIGHT = 280  # and how far its rows reach down
+
+
+class WaveError(Exception):
+    pass
+
+
+# one formation: rows of invaders, each row `columns` invaders `spacing`
+# pixels apart starting at x. speed scales the difficulty's horizontal
+# invader speed, drop is how far the formation falls at each edge
+class Wave:
+    def __init__(self, rows, columns=10, spacing=65, x=0, speed=1.0, drop=50):
+        self.rows = rows  # [(y, color)] top to bottom
+        self.columns = columns
+        self.spacing = spacing
+        self.x = x
+        self.speed = speed
+        self.drop = drop
+
+    def size(self):
+        return len(self.rows) * self.columns
+
+    def faster(self, speed):
+        return Wave(self.rows, self.columns, self.spacing, self.x, speed, self.drop)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# what is wrong with a wave from a file, None if nothing. a wave with no
+# invaders would respawn every frame, so the game would never end
+def wave_problem(wave):
+    if not wave.rows:
+        return "has no rows"
+    if not isinstance(wave.columns, int) or isinstance(wave.columns, bool) or wave.columns < 1:
+        return "needs a whole number of columns, at least 1"
+    if not all(is_number(value) for value in (wave.spacing, wave.x, wave.speed, wave.drop)):
+        return "needs numbers for spacing, x, speed and drop"
+    if any(not is_number(y) for y, color in wave.rows):
+        return "needs a number for each row's y"
+    if any(color not in COLORS for y, color in wave.rows):
+        return f"has an invader color that isn't one of {COLORS}"
+    return None
+
+
+# the waves of a game, one per level. past the last one the last wave repeats,
+# speed_step faster every level up to max_speed
+class WaveSet:
+    def __init__(self, waves, speed_step=0.0, max_speed=None):
+        if not waves:
+            raise WaveError("a wave set needs at least one wave")
+        self.waves = waves
+        self.speed_step = speed_step
+        self.max_speed = max_speed
+
+    # the wave for a level, counting from 1
+    def wave(self, level):
+        if level <= len(self.waves):
+            return self.waves[level - 1]
+        last = self.waves[-1]
+        if not self.speed_step:
+            return last
+        speed = last.speed + self.speed_step * (level - len(self.waves))
+        if self.max_speed is not None:
+            speed = min(speed, self.max_speed)
+        return last.faster(speed)
+
+    # most invaders any wave puts on screen at once
+    def largest(self):
+        return max(wave.size() for wave in self.waves)
+
+    @classmethod
+    def load(cls, path=WAVES_FILE):
+        try:
+            with open(path, "r") as waves_file:
+                data = json.load(waves_file)
+        except (OSError, ValueError) as error:
+            raise WaveError(f"{path} could not be read: {error}")
+        try:
+            waves = [Wave([(y, color) for y, color in wave["rows"]], wave.get("columns", 10),
+                          wave.get("spacing", 65), wave.get("x", 0), wave.get("speed", 1.0), wave.get("drop", 50))
+                     for wave in data["waves"]]
+            waves_set = cls(waves, data.get("speed_step", 0.0), data.get("max_speed"))
+        except (KeyError, TypeError, ValueError) as error:
+            raise WaveError(f"{path} is not a valid wave file: {error!r}")
+        except WaveError as error:
+            raise WaveError(f"{path}: {error}")
+        for i, wave in enumerate(waves, 1):
+            problem = wave_problem(wave)
+            if problem is not None:
+                raise WaveError(f"{path}: wave {i} {problem}")
+        if not is_number(waves_set.speed_step) or not (waves_set.max_speed is None or is_number(waves_set.max_speed)):
+            raise WaveError(f"{path}: speed_step and max_speed must be numbers")
+        return waves_set
+
+    # every level is one formation of about count invaders packed into the
+    # space the classic formation takes up, for stress testing
+    @classmethod
+    def stress(cls, count, drop=50):
+        if count < 1:
+            raise WaveError("a stress formation needs at least 1 invader")
+        columns = min(count, max(10, int(math.sqrt(count * 2))))
+        rows = math.ceil(count / columns)
+        spacing = (FORMATION_WIDTH - 65) // max(columns - 1, 1)
+        row_spacing = min(60, (FORMATION_HEIGHT - 70) // max(rows - 1, 1))
+        wave = Wave([(70 + row_spacing * row, COLORS[row % len(COLORS)]) for row in range(rows)],
+                    columns, spacing, drop=drop)
+        return cls([wave])